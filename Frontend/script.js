@@ -104,6 +104,35 @@ document.addEventListener('DOMContentLoaded', () => {
         messageDiv.innerHTML = `<p>${message}</p>`;
         chatBody.appendChild(messageDiv);
         chatBody.scrollTop = chatBody.scrollHeight; // Auto-scroll to the latest message
+        return messageDiv;
+    }
+
+    // Reads a server-sent event stream from /chat or /feedback, calling onChunk with
+    // the text received so far each time a piece arrives. Resolves with the full text.
+    async function readEventStream(response, onChunk) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let text = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+
+            // Events are separated by a blank line; the last piece may be incomplete
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+            for (const event of events) {
+                if (event.startsWith('event: done')) return text;
+                const data = event.split('\n').find(line => line.startsWith('data: '));
+                if (data) {
+                    text += JSON.parse(data.slice(6));
+                    onChunk(text);
+                }
+            }
+        }
+        return text;
     }
 
     function resetChat() {
@@ -239,9 +268,13 @@ document.addEventListener('DOMContentLoaded', () => {
                     throw new Error(`HTTP error! Status: ${response.status}`);
                 }
 
-                const data = await response.json();
-                addMessage(data.response, 'ai');
-                conversationHistory.push({ sender: 'ai', text: data.response });
+                // Show the reply as it streams in instead of waiting for all of it
+                const messageDiv = addMessage('', 'ai');
+                const aiResponse = await readEventStream(response, (text) => {
+                    messageDiv.innerHTML = `<p>${text}</p>`;
+                    chatBody.scrollTop = chatBody.scrollHeight;
+                });
+                conversationHistory.push({ sender: 'ai', text: aiResponse });
             } catch (error) {
                 console.error('Error sending message to backend:', error);
                 addMessage("I'm sorry, I encountered an error. Please try again.", 'ai');
@@ -346,7 +379,14 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(`HTTP error! Status: ${response.status} - ${errorData.detail || response.statusText}`);
             }
 
-            const data = await response.json();
+            // The session exists now; the AI's first message is generated separately
+            const initialResponse = await fetch(`${backendUrl}/start_chat/${encodeURIComponent(currentSessionId)}/initial`);
+            if (!initialResponse.ok) {
+                const errorData = await initialResponse.json();
+                throw new Error(`HTTP error! Status: ${initialResponse.status} - ${errorData.detail || initialResponse.statusText}`);
+            }
+
+            const data = await initialResponse.json();
             // Clear the loading message and display the AI's first message
             chatBody.innerHTML = ''; 
             addMessage(data.response, 'ai');
@@ -393,10 +433,10 @@ document.addEventListener('DOMContentLoaded', () => {
                     throw new Error(`HTTP error! Status: ${response.status} - ${errorData.detail || response.statusText}`);
                 }
 
-                const data = await response.json();
-                //feedbackContent.innerHTML = data.feedback; 
-                const formattedFeedback = formatFeedbackText(data.feedback);
-                feedbackContent.innerHTML = formattedFeedback
+                // Render the feedback as it streams in, reformatting the text so far
+                await readEventStream(response, (text) => {
+                    feedbackContent.innerHTML = formatFeedbackText(text);
+                });
 
             } catch (error) {
                 console.error('Error requesting feedback from backend:', error);
@@ -1,7 +1,10 @@
 import time
 import random
-from typing import List, Dict
+import datetime
+import re
+from typing import List, Dict, Any, Literal
 import google.generativeai as genai
+from google.generativeai import caching
 import os
 from dotenv import load_dotenv
 
@@ -29,7 +32,24 @@ except KeyError:
     print("Please set your Gemini API key as an environment variable or uncomment and update the script.")
     exit()
 
-gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+MODEL_NAME = 'gemini-1.5-flash'
+
+# Explicit context caches are only accepted above a minimum prompt size
+CACHE_MIN_TOKENS = 32768
+CACHE_TTL_SECONDS = 600
+
+gemini_model = genai.GenerativeModel(MODEL_NAME)
+
+# Set SIMULATE_DELAY=1 to add artificial delays that make the demo feel more realistic
+SIMULATE_DELAY = bool(os.getenv("SIMULATE_DELAY"))
+
+# Request options per service tier. This SDK has no service-tier field, so the tier
+# decides how long a call may take: live chat fails fast, offline runs wait out queueing.
+SERVICE_TIER_REQUEST_OPTIONS: Dict[str, Dict[str, Any]] = {
+    'standard': {},
+    'priority': {'timeout': 30},
+    'flex': {'timeout': 900},
+}
 
 class MockGeminiAPI:
     """
@@ -62,13 +82,19 @@ class MockGeminiAPI:
 #gemini_model = MockGeminiAPI()
 
 
+# Fixed pieces of the per-turn prompt
+ALL_ANSWERED_DIRECTIVE = "Your next action: You have received answers to all your questions. End the chat politely.\n"
+RESPONSE_CUE = "Your response (as the customer):"
+
+
 class Chatbot:
     """
     A chatbot designed to simulate a customer interacting with customer service.
     It has a defined goal, tone, name, and backstory.
     """
 
-    def __init__(self, name: str, backstory: str, tone: str, goal_questions: List[str]):
+    def __init__(self, name: str, backstory: str, tone: str, goal_questions: List[str],
+                 service_tier: Literal['standard', 'priority', 'flex'] = 'standard'):
         """
         Initializes the chatbot with its persona and goal.
 
@@ -77,93 +103,148 @@ class Chatbot:
             backstory (str): The backstory/context for the chatbot.
             tone (str): The desired tone of the conversation (e.g., "polite", "frustrated", "neutral").
             goal_questions (List[str]): A list of questions the chatbot needs to ask/get answers for.
+            service_tier (str): 'priority' for interactive chats, 'flex' for offline runs.
         """
         self.name = name
+        self.service_tier = service_tier
         self.backstory = backstory
         self.tone = tone
         self.goal_questions = goal_questions
-        self.asked_questions = set()  # To keep track of questions already asked
+        # Questions already asked/addressed, packed into one int: bit i is goal question i
+        self._asked_mask = 0
+        self._all_mask = (1 << len(goal_questions)) - 1
         self.chat_history: List[Dict[str, str]] = []
-        self.current_question_index = 0
+
+        # Goal questions are fixed, so they are lowered and their keywords compiled
+        # into one pattern per goal up front instead of being re-split every turn
+        self._lower_goals = [q.lower() for q in self.goal_questions]
+        self._goal_patterns = [
+            re.compile("|".join(map(re.escape, q.split()))) if q.split() else None
+            for q in self._lower_goals
+        ]
+
+        # The persona never changes after construction, so it is sent once as a
+        # byte-identical system instruction instead of being re-sent every turn.
+        self._static_prefix = (
+            f"You are {self.name}. Your backstory is: '{self.backstory}'.\n"
+            f"Your current goal is to get answers to the following questions: {', '.join(self.goal_questions)}.\n"
+            f"Maintain a {self.tone} tone throughout the conversation.\n"
+            "Simulate a conversation with a customer service representative.\n"
+        )
+        # The "ask the next question" directive for each goal, formatted once
+        self._goal_directives = [
+            f"Your next action: Ask the question: '{q}'.\n"
+            "Formulate your response as a customer asking this question, maintaining your tone.\n"
+            for q in self.goal_questions
+        ]
+
+        # Gemini's chat session keeps the turn history, so each call only sends the new turn
+        self._chat = self._create_model().start_chat(history=[])
         print(f"Chatbot '{self.name}' initialized with tone: '{self.tone}' and goal: {self.goal_questions}")
 
-    def _call_gemini_api(self, prompt: str) -> str:
+    @property
+    def current_question_index(self) -> int:
+        """
+        Index of the first question not yet asked, or len(goal_questions) once all have been.
+        """
+        remaining = ~self._asked_mask & self._all_mask
+        # Isolate the lowest set bit and take its position
+        return (remaining & -remaining).bit_length() - 1 if remaining else len(self.goal_questions)
+
+    def _create_model(self) -> genai.GenerativeModel:
+        """
+        Creates the model for this chatbot with the static prefix as its system instruction.
+        Uses Gemini's context cache when the prefix is large enough to be accepted.
         """
-        Simulates calling the Gemini API to generate a response.
-        In a real application, this would be an actual API call.
+        if len(self._static_prefix) // 4 >= CACHE_MIN_TOKENS:
+            try:
+                cached = caching.CachedContent.create(
+                    model=f"models/{MODEL_NAME}",
+                    system_instruction=self._static_prefix,
+                    ttl=datetime.timedelta(seconds=CACHE_TTL_SECONDS),
+                )
+                return genai.GenerativeModel.from_cached_content(cached_content=cached)
+            except Exception as e:
+                print(f"Context cache unavailable, sending system instruction inline: {e}")
+        return genai.GenerativeModel(MODEL_NAME, system_instruction=self._static_prefix)
+
+    def _call_gemini_api(self, prompt: str, echo: bool = False) -> str:
+        """
+        Calls the Gemini API to generate a response. The response is streamed, so
+        with `echo` it is printed as it is generated instead of after the last token.
 
         Args:
             prompt (str): The prompt to send to the Gemini model.
+            echo (bool): Print the response chunks as they arrive.
 
         Returns:
             str: The generated response from the model.
         """
-        # Simulate network delay
-        time.sleep(random.uniform(0.5, 1.5))
+        # Optional simulated network delay for demos
+        if SIMULATE_DELAY:
+            time.sleep(random.uniform(0.5, 1.5))
         try:
-            # This is where the actual Gemini API call would go.
-            # For this example, we use the mock.
-            response_text = gemini_model.generate_content(prompt)
-            return response_text.text
+            # Only the new turn is sent; the persona is carried by the model and
+            # earlier turns by the chat session.
+            response = self._chat.send_message(
+                prompt, stream=True, request_options=SERVICE_TIER_REQUEST_OPTIONS[self.service_tier]
+            )
+            chunks = []
+            try:
+                for chunk in response:
+                    try:
+                        chunk_text = chunk.text
+                    except ValueError:
+                        # A chunk without text, e.g. the one carrying a safety stop
+                        continue
+                    chunks.append(chunk_text)
+                    if echo:
+                        print(chunk_text, end="", flush=True)
+                # Reading the history records the turn, or raises if the response was blocked or broken
+                self._chat.history
+            except Exception:
+                # Otherwise the unfinished turn stays in the chat session and every later send fails
+                self._chat.rewind()
+                raise
+            return "".join(chunks)
         except Exception as e:
             print(f"Error calling Gemini API: {e}")
             return "I'm sorry, I'm having trouble connecting right now. Please try again later."
 
     def _construct_prompt(self, customer_service_response: str = "") -> str:
         """
-        Constructs the prompt for the Gemini model, incorporating the chatbot's
-        persona, chat history, and the current customer service response.
+        Constructs the per-turn prompt for the Gemini model. The persona is in the
+        static prefix and earlier turns were already sent, so only the current
+        customer service response and the next action are included.
 
         Args:
             customer_service_response (str): The last response from customer service.
 
         Returns:
-            str: The complete prompt string.
+            str: The prompt string for this turn.
         """
-        # Start with the chatbot's persona
-        prompt = f"You are {self.name}. Your backstory is: '{self.backstory}'.\n"
-        prompt += f"Your current goal is to get answers to the following questions: {', '.join(self.goal_questions)}.\n"
-        prompt += f"Maintain a {self.tone} tone throughout the conversation.\n"
-        prompt += "Simulate a conversation with a customer service representative.\n"
-
-        # Add chat history
-        if self.chat_history:
-            prompt += "\n--- Conversation History ---\n"
-            for entry in self.chat_history:
-                prompt += f"{entry['role']}: {entry['text']}\n"
-            prompt += "--------------------------\n"
+        parts = []
 
         # Add the latest customer service response if available
         if customer_service_response:
-            prompt += f"Customer Service: {customer_service_response}\n"
+            parts.append(f"Customer Service: {customer_service_response}\n")
 
         # Determine the next action based on goal and history
         if not self.is_goal_achieved():
-            next_question = self.goal_questions[self.current_question_index]
-            if next_question not in self.asked_questions:
-                prompt += f"Your next action: Ask the question: '{next_question}'.\n"
-                prompt += "Formulate your response as a customer asking this question, maintaining your tone.\n"
-            else:
-                # If the current question was already asked, try to move to the next
-                self.current_question_index += 1
-                if self.current_question_index < len(self.goal_questions):
-                    next_question = self.goal_questions[self.current_question_index]
-                    prompt += f"Your next action: Ask the question: '{next_question}'.\n"
-                    prompt += "Formulate your response as a customer asking this question, maintaining your tone.\n"
-                else:
-                    prompt += "Your next action: You have asked all your questions. Conclude the conversation politely.\n"
+            # current_question_index always points at the first question not yet asked
+            parts.append(self._goal_directives[self.current_question_index])
         else:
-            prompt += "Your next action: You have received answers to all your questions. End the chat politely.\n"
+            parts.append(ALL_ANSWERED_DIRECTIVE)
 
-        prompt += "Your response (as the customer):"
-        return prompt
+        parts.append(RESPONSE_CUE)
+        return "".join(parts)
 
     def is_goal_achieved(self) -> bool:
         """
         Checks if the chatbot has asked all its goal questions.
         In a more advanced scenario, this would also check if answers were satisfactory.
         """
-        return len(self.asked_questions) == len(self.goal_questions)
+        return self._asked_mask == self._all_mask
 
     def start_chat(self, max_turns: int = 10):
         """
@@ -193,12 +274,14 @@ class Chatbot:
 
             # Chatbot (Customer) generates its message
             prompt = self._construct_prompt(customer_service_response)
-            customer_message = self._call_gemini_api(prompt)
-            print(f"[{self.name}]: {customer_message}")
+            print(f"[{self.name}]: ", end="", flush=True)
+            customer_message = self._call_gemini_api(prompt, echo=True)
+            print()
             self.chat_history.append({"role": self.name, "text": customer_message})
 
             # Simulate customer service processing the message
-            time.sleep(random.uniform(0.5, 1.0))
+            if SIMULATE_DELAY:
+                time.sleep(random.uniform(0.5, 1.0))
 
             # --- MODIFICATION START ---
             # Now, instead of simulating, we ask for user input for customer service
@@ -210,22 +293,23 @@ class Chatbot:
             self.chat_history.append({"role": "Customer Service", "text": customer_service_response})
 
             # Check if the current question from the goal was addressed/asked
-            if self.current_question_index < len(self.goal_questions):
-                current_goal_q = self.goal_questions[self.current_question_index].lower()
+            index = self.current_question_index
+            if index < len(self.goal_questions):
+                current_goal_q = self._lower_goals[index]
+                goal_pattern = self._goal_patterns[index]
                 # We'll check if the user's response contains keywords from the goal question
-                if any(keyword in customer_service_response.lower() for keyword in current_goal_q.split()):
-                    self.asked_questions.add(self.goal_questions[self.current_question_index])
-                    print(f"[DEBUG]: Question '{self.goal_questions[self.current_question_index]}' marked as asked/addressed.")
-                    self.current_question_index += 1 # Move to the next question
+                if goal_pattern and goal_pattern.search(customer_service_response.lower()):
+                    self._asked_mask |= 1 << index # Also moves on to the next question
+                    print(f"[DEBUG]: Question '{self.goal_questions[index]}' marked as asked/addressed.")
                 elif current_goal_q in customer_message.lower(): # Also check if the customer chatbot asked it
-                    self.asked_questions.add(self.goal_questions[self.current_question_index])
-                    print(f"[DEBUG]: Question '{self.goal_questions[self.current_question_index]}' marked as asked/addressed by chatbot.")
-                    self.current_question_index += 1 # Move to the next question
+                    self._asked_mask |= 1 << index
+                    print(f"[DEBUG]: Question '{self.goal_questions[index]}' marked as asked/addressed by chatbot.")
 
 
         if not self.is_goal_achieved():
             print(f"\n--- Chat Session Ended (Max turns reached) ---")
-            print(f"Goal not fully achieved. Remaining questions: {set(self.goal_questions) - self.asked_questions}")
+            remaining = [q for i, q in enumerate(self.goal_questions) if not self._asked_mask >> i & 1]
+            print(f"Goal not fully achieved. Remaining questions: {remaining}")
         else:
             print(f"\n--- Chat Session Completed Successfully ---")
             print(f"All goal questions were addressed.")
@@ -244,7 +328,8 @@ if __name__ == "__main__":
             "What is your long-term strategy to repair your image? Are you considering a more transparent approach moving forward?",
             "Given the current situation, how do you propose we adjust the terms of our existing agreement to reflect the decreased value of your endorsement, if at all?",
             "What is the actual truth regarding these claims? We need to understand the full scope to assess our risk."
-        ]
+        ],
+        service_tier="priority" # A person is typing the other side of this chat
     )
 
     # Start the simulated chat
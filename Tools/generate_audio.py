@@ -1,6 +1,11 @@
-
+import re
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 from gtts import gTTS
 
+# gTTS sends at most this many characters per request
+MAX_CHUNK_CHARS = 100
+
 # Define the script to be narrated
 script = """
 So, Ava Sharma—aka @AuthenticAva—just dropped a blog post about her ‘humble beginnings.’
@@ -16,8 +21,32 @@ So… was it all a lie? Or just a carefully curated version of the truth?
 You decide.
 """
 
-# Generate the audio using gTTS
-tts = gTTS(text=script, lang='en', slow=False)
-tts.save("ava_sharma_expose.mp3")
+def split_script(text, max_chars=MAX_CHUNK_CHARS):
+    """
+    Splits the script on sentence boundaries, packing sentences into chunks of at
+    most max_chars. A longer single sentence becomes its own chunk and gTTS splits it further.
+    """
+    chunks = []
+    for sentence in re.split(r'(?<=[.!?])\s+', text.strip()):
+        if chunks and len(chunks[-1]) + 1 + len(sentence) <= max_chars:
+            chunks[-1] += " " + sentence
+        else:
+            chunks.append(sentence)
+    return chunks
+
+def synthesize(chunk):
+    """Returns the MP3 bytes for one chunk of text."""
+    buffer = BytesIO()
+    gTTS(text=chunk, lang='en', slow=False).write_to_fp(buffer)
+    return buffer.getvalue()
+
+# Generate the audio using gTTS. Each chunk is a separate HTTP round-trip, so they
+# are requested in parallel; map() keeps the results in script order.
+with ThreadPoolExecutor(max_workers=8) as executor:
+    blobs = list(executor.map(synthesize, split_script(script)))
+
+# MP3 is a sequence of self-contained frames, so the chunks can simply be concatenated
+with open("ava_sharma_expose.mp3", "wb") as f:
+    f.writelines(blobs)
 
 print("Audio file 'ava_sharma_expose.mp3' has been generated.")
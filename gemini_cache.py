@@ -0,0 +1,173 @@
+import hashlib
+import re
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import numpy as np
+from cachetools import LRUCache
+
+
+def normalize_message(message: str) -> str:
+    """
+    Lowercases the message and collapses its whitespace, so trivially different
+    messages share an embedding.
+    """
+    return re.sub(r"\s+", " ", message).strip().lower()
+
+
+def extend_context_key(context_key: str, *parts: str) -> str:
+    """
+    Returns the key of a conversation context after `parts` were added to it. Sessions
+    keep a running key this way, so identifying the context costs the same on every
+    turn instead of growing with the history.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (context_key, *parts):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """
+    Caches Gemini responses so a repeated prompt in the same conversation context
+    (same persona and same turns so far) does not go back to the API.
+
+    Contexts are identified by the running key the session builds with
+    `extend_context_key`, starting from its persona, so changing the persona
+    invalidates its entries.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept.
+        """
+        self._responses: LRUCache = LRUCache(maxsize=maxsize)
+
+    def lookup(self, context_key: str, prompt: str) -> Optional[str]:
+        """
+        Returns the cached response to the prompt in this context, or None on a miss.
+        """
+        return self._responses.get(extend_context_key(context_key, prompt))
+
+    def store(self, context_key: str, prompt: str, response: str):
+        """
+        Stores a freshly generated response. Only call this for successful responses.
+        """
+        self._responses[extend_context_key(context_key, prompt)] = response
+
+    async def get_or_generate(self, context_key: str, prompt: str, generate: Callable[[], Awaitable[str]]) -> Tuple[str, bool]:
+        """
+        Returns the cached response for the prompt in this context, calling `generate`
+        on a miss. Exceptions from `generate` propagate and nothing is cached.
+
+        Args:
+            context_key (str): The running key of everything that precedes the prompt.
+            prompt (str): The new prompt.
+            generate (Callable[[], Awaitable[str]]): Produces the response on a miss.
+
+        Returns:
+            Tuple[str, bool]: The response and whether it came from the cache.
+        """
+        cached = self.lookup(context_key, prompt)
+        if cached is not None:
+            return cached, True
+        response = await generate()
+        self.store(context_key, prompt, response)
+        return response, False
+
+
+class _ReplyRing:
+    """
+    The latest replies stored under one key, with their unit-length message embeddings
+    in a preallocated matrix. Once full, each new reply overwrites the oldest.
+    """
+
+    __slots__ = ("vectors", "replies", "size", "next")
+
+    def __init__(self, capacity: int, dim: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.replies: List[Optional[str]] = [None] * capacity
+        self.size = 0
+        self.next = 0
+
+    def add(self, vector: np.ndarray, reply: str):
+        self.vectors[self.next] = vector
+        self.replies[self.next] = reply
+        self.next = (self.next + 1) % len(self.replies)
+        self.size = min(self.size + 1, len(self.replies))
+
+
+class ScenarioReplyCache:
+    """
+    Reuses AI customer replies across sessions of the same scenario. Customer service
+    answers to a given goal question tend to be near-identical between sessions
+    ("The default password is on the sticker..."), and so is the customer's reply to them.
+
+    Entries are keyed by (scenario, index of the goal question being asked) and matched
+    on the embedding of the normalized customer service message.
+    """
+
+    def __init__(self, embed: Callable[[str], Awaitable[Optional[np.ndarray]]],
+                 maxsize: int = 1024, replies_per_key: int = 64, similarity_threshold: float = 0.92):
+        """
+        Args:
+            embed (Callable[[str], Awaitable[Optional[np.ndarray]]]): Returns the unit-length
+                embedding of a text, or None if it can't be computed.
+            maxsize (int): Maximum number of (scenario, question index) keys kept.
+            replies_per_key (int): Maximum number of replies kept per key; the oldest is
+                replaced first. Bounds the memory and the lookup cost of a busy scenario.
+            similarity_threshold (float): Minimum cosine similarity for a hit.
+        """
+        self._embed = embed
+        self.replies_per_key = replies_per_key
+        self.similarity_threshold = similarity_threshold
+        # (scenario, question index) -> _ReplyRing of the latest replies for it
+        self._entries: LRUCache = LRUCache(maxsize=maxsize)
+        # Normalized messages already embedded, so a verbatim repeat skips the embedding call
+        self._vectors: LRUCache = LRUCache(maxsize=maxsize * 8)
+
+    async def lookup(self, scenario: str, question_index: int, message: str,
+                     vector: Optional[np.ndarray] = None) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Looks up a reply given to a similar message for the same scenario and goal question.
+
+        Args:
+            scenario (str): Identifies the scenario the session runs.
+            question_index (int): Index of the goal question the customer asks next.
+            message (str): The customer service message being replied to.
+            vector (Optional[np.ndarray]): The embedding of the normalized message, if the
+                caller already has it.
+
+        Returns:
+            Tuple[Optional[str], Optional[np.ndarray]]: The cached reply (None on a miss)
+            and the message embedding, to hand back to `store` after a miss.
+        """
+        normalized = normalize_message(message)
+        if vector is None:
+            vector = self._vectors.get(normalized)
+        if vector is None:
+            vector = await self._embed(normalized)
+            if vector is None:
+                return None, None
+            self._vectors[normalized] = vector
+
+        ring = self._entries.get((scenario, question_index))
+        if ring is not None and ring.size:
+            similarities = ring.vectors[:ring.size] @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] >= self.similarity_threshold:
+                return ring.replies[best], vector
+        return None, vector
+
+    def store(self, scenario: str, question_index: int, reply: str, vector: Optional[np.ndarray]):
+        """
+        Stores a freshly generated reply. Only call this for successful responses.
+        """
+        if vector is None:
+            return
+        key = (scenario, question_index)
+        ring = self._entries.get(key)
+        if ring is None:
+            ring = self._entries[key] = _ReplyRing(self.replies_per_key, vector.shape[0])
+        ring.add(vector, reply)
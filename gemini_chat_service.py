@@ -1,10 +1,34 @@
 import time
 import random
-from typing import List, Dict, Any
-import google.generativeai as genai
+import asyncio
+import datetime
+import functools
+import json
+import logging
+import re
+import tempfile
+from contextlib import aclosing, asynccontextmanager, nullcontext
+from typing import List, Dict, Any, Optional, Tuple, FrozenSet, Set, Callable, Literal, AsyncIterator, Awaitable, TypeVar, TYPE_CHECKING
+import numpy as np
+from aiolimiter import AsyncLimiter
+from jinja2 import Environment, StrictUndefined
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 import os
 from dotenv import load_dotenv
 
+from gemini_cache import ResponseCache, ScenarioReplyCache, extend_context_key, normalize_message
+
+try:
+    import ahocorasick # pyahocorasick, optional
+except ImportError:
+    ahocorasick = None
+
+if TYPE_CHECKING:
+    # The SDK itself is imported on first use, see get_genai
+    import google.generativeai as genai
+
+log = logging.getLogger(__name__)
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -12,29 +36,350 @@ load_dotenv()
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
 if not GOOGLE_API_KEY:
-    print("Error: GOOGLE_API_KEY environment variable not set.")
-    print("Please set your Gemini API key as an environment variable or uncomment and update the script.")
+    log.error("GOOGLE_API_KEY environment variable not set. "
+              "Please set your Gemini API key as an environment variable or uncomment and update the script.")
     # In a production environment, you might raise an exception or exit here
-else:
+
+@functools.lru_cache(maxsize=1)
+def get_genai():
+    """
+    Imports and configures the Gemini SDK the first time it is needed. The SDK pulls in
+    gRPC and protobuf, which dominate import time, so code that never calls Gemini
+    (tools, tests, a worker still booting) doesn't pay for it.
+
+    This is the only place the SDK is configured. Sessions must never call
+    genai.configure themselves, as that would replace the shared client and its connections.
+    The default gRPC transport already multiplexes every call over one long-lived HTTP/2
+    channel, so connection setup is paid once (see warm_up) rather than per turn.
+    """
+    import google.generativeai as genai
+
+    if GOOGLE_API_KEY:
+        try:
+            genai.configure(api_key=GOOGLE_API_KEY)
+        except Exception as e:
+            log.error("Error configuring Gemini API: %s", e)
+            # Consider making GOOGLE_API_KEY = None if config fails to prevent subsequent API calls
+    return genai
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+# Explicit context caches are only accepted above a minimum prompt size. Smaller
+# prefixes are still sent as a byte-stable system instruction, which Gemini's
+# implicit caching can reuse between turns.
+CACHE_MIN_TOKENS = 1024
+CACHE_TTL_SECONDS = 600
+
+@functools.lru_cache(maxsize=1)
+def get_model() -> "genai.GenerativeModel":
+    """
+    Returns the shared Gemini model used for one-off prompts (feedback, sentiment).
+    """
+    return get_genai().GenerativeModel(MODEL_NAME)
+
+# Server startup waits for the warm-up, so it is given up on quickly when Gemini is slow
+WARM_UP_TIMEOUT_SECONDS = 5
+
+async def warm_up():
+    """
+    Makes a one-token call so the client and its connection to Gemini are set up
+    before the first real request instead of during it. Gives up after
+    WARM_UP_TIMEOUT_SECONDS; the first real request then sets them up.
+    """
+    if not GOOGLE_API_KEY:
+        return
     try:
-        genai.configure(api_key=GOOGLE_API_KEY)
+        await asyncio.wait_for(
+            get_model().generate_content_async("ping", generation_config={"max_output_tokens": 1}),
+            WARM_UP_TIMEOUT_SECONDS,
+        )
     except Exception as e:
-        print(f"Error configuring Gemini API: {e}")
-        # Consider making GOOGLE_API_KEY = None if config fails to prevent subsequent API calls
+        log.warning("Gemini warm-up call failed: %s", e)
+
+# Request options per service tier. This SDK has no service-tier field, so the tier
+# decides how long a call may take: live chat fails fast, offline runs wait out queueing.
+ServiceTier = Literal['standard', 'priority', 'flex']
+SERVICE_TIER_REQUEST_OPTIONS: Dict[str, Dict[str, Any]] = {
+    'standard': {},
+    'priority': {'timeout': 30},
+    'flex': {'timeout': 900},
+}
+
+# Set SIMULATE_DELAY=1 to add an artificial network delay before each call in demos
+SIMULATE_DELAY = bool(os.getenv("SIMULATE_DELAY"))
+
+# Every server worker process has its own semaphore and limiters, so the limits below
+# (which are for the whole deployment) are split between the workers. gunicorn reads
+# its worker count from the same variable.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+# Caps in-flight Gemini calls across all sessions; size it to your RPM tier to avoid 429s.
+# A streamed call holds its slot until the stream has been consumed.
+GEMINI_MAX_CONCURRENCY = max(1, int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")) // WEB_CONCURRENCY)
+gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENCY)
+
+# Feedback prompts carry the whole transcript and take the longest to generate. Capping
+# them below GEMINI_MAX_CONCURRENCY keeps a burst of feedback requests from taking
+# every slot and stalling live chat turns behind them.
+FEEDBACK_MAX_CONCURRENCY = max(1, int(os.getenv("FEEDBACK_MAX_CONCURRENCY", str(GEMINI_MAX_CONCURRENCY // 2))))
+feedback_semaphore = asyncio.Semaphore(FEEDBACK_MAX_CONCURRENCY)
+
+# Requests and (estimated) input tokens per minute allowed by your Gemini tier
+GEMINI_RPM = max(1, int(os.getenv("GEMINI_RPM", "60")) // WEB_CONCURRENCY)
+GEMINI_TPM = max(1, int(os.getenv("GEMINI_TPM", "1000000")) // WEB_CONCURRENCY)
+request_limiter = AsyncLimiter(GEMINI_RPM, 60)
+token_limiter = AsyncLimiter(GEMINI_TPM, 60)
+# The embedding model has its own per-minute request quota, separate from generation's
+EMBEDDING_RPM = max(1, int(os.getenv("EMBEDDING_RPM", "1500")) // WEB_CONCURRENCY)
+embedding_limiter = AsyncLimiter(EMBEDDING_RPM, 60)
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Transient errors (rate limits, unavailability, timeouts) are retried; anything
+    else is reported straight away.
+    """
+    # Imported here for the same reason as the SDK, see get_genai
+    from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable, DeadlineExceeded
+    return isinstance(error, (ResourceExhausted, ServiceUnavailable, DeadlineExceeded))
+
+T = TypeVar("T")
+
+async def call_gemini_with_retry(call: Callable[[], Awaitable[T]], prompt_chars: int,
+                                 semaphore: Optional[asyncio.Semaphore] = gemini_semaphore,
+                                 limiter: AsyncLimiter = request_limiter,
+                                 tokens: Optional[AsyncLimiter] = token_limiter) -> T:
+    """
+    Runs a Gemini call within the request/token rate limits and the concurrency cap,
+    retrying rate-limit and availability errors with exponential backoff and jitter.
 
-# Initialize the Gemini model
-gemini_model = genai.GenerativeModel('gemini-2.5-flash')
+    Args:
+        call (Callable[[], Awaitable[T]]): Starts the Gemini request.
+        prompt_chars (int): Size of everything sent, used to estimate input tokens.
+        semaphore (Optional[asyncio.Semaphore]): The concurrency cap to hold during the
+            call, or None when the caller already holds a slot.
+        limiter (AsyncLimiter): The requests-per-minute quota the call counts against.
+        tokens (Optional[AsyncLimiter]): The input tokens-per-minute quota, if the call has one.
+
+    Returns:
+        T: Whatever the call returns. The last error is re-raised once retries run out.
+    """
+    async for attempt in AsyncRetrying(
+        wait=wait_exponential_jitter(initial=0.5, max=8),
+        stop=stop_after_attempt(5),
+        retry=retry_if_exception(is_retryable),
+        reraise=True,
+    ):
+        with attempt:
+            async with limiter:
+                if tokens is not None:
+                    await tokens.acquire(min(tokens.max_rate, max(1, prompt_chars // 4)))
+                async with semaphore or nullcontext():
+                    return await call()
+
+@asynccontextmanager
+async def stream_gemini_with_retry(call: Callable[[], Awaitable[T]], prompt_chars: int) -> AsyncIterator[T]:
+    """
+    Starts a streamed Gemini call like `call_gemini_with_retry`, but keeps its
+    concurrency slot until the block exits. The call returns once the first chunk
+    arrives while generation goes on, so the stream must be consumed inside the block.
+    Only starting the stream is retried; chunks already yielded can't be taken back.
+    """
+    async with gemini_semaphore:
+        yield await call_gemini_with_retry(call, prompt_chars, semaphore=None)
+
+EMBEDDING_MODEL = 'models/text-embedding-004'
+
+async def embed_many(texts: List[str]) -> Optional[np.ndarray]:
+    """
+    Embeds several texts in one request, retried like generation but counted against
+    the embedding quota. Embeddings are quick, so they take no generation slot.
+
+    Returns:
+        Optional[np.ndarray]: One unit-length row per text, or None if they can't be computed.
+    """
+    try:
+        result = await call_gemini_with_retry(
+            lambda: get_genai().embed_content_async(
+                model=EMBEDDING_MODEL, content=texts, task_type="SEMANTIC_SIMILARITY"
+            ),
+            sum(len(text) for text in texts),
+            semaphore=None,
+            limiter=embedding_limiter,
+            tokens=None,
+        )
+    except Exception as e:
+        log.error("Error embedding text: %s", e)
+        return None
+    vectors = np.asarray(result["embedding"], dtype=np.float32).reshape(len(texts), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    if not norms.all():
+        return None
+    return vectors / norms
+
+async def embed(text: str) -> Optional[np.ndarray]:
+    """
+    Returns the unit-length embedding of the text, or None if it can't be computed.
+    """
+    vectors = await embed_many([text])
+    return None if vectors is None else vectors[0]
+
+# Shared response cache; set GEMINI_RESPONSE_CACHE=0 to always call the API
+response_cache = ResponseCache() if os.getenv("GEMINI_RESPONSE_CACHE", "1") == "1" else None
+# Replies shared between sessions of the same scenario; set GEMINI_REPLY_CACHE=0 to disable
+reply_cache = ScenarioReplyCache(embed) if os.getenv("GEMINI_REPLY_CACHE", "1") == "1" else None
+
+# A customer service message answers a goal when its embedding is at least this close to the question's
+GOAL_SIMILARITY_THRESHOLD = 0.75
+
+# Unit-length goal question embeddings (one row per goal), keyed by the goal questions.
+# Stored as float16 to halve their memory; the threshold check doesn't notice the rounding.
+_goal_vectors: Dict[Tuple[str, ...], np.ndarray] = {}
+
+async def get_goal_vectors(goal_questions: List[str]) -> Optional[np.ndarray]:
+    """
+    Returns the embeddings of the goal questions, computed with one request the first
+    time a scenario's goals are seen. None if they can't be computed.
+    """
+    key = tuple(goal_questions)
+    if key not in _goal_vectors:
+        vectors = await embed_many(list(key)) if key else None
+        if vectors is None:
+            return None
+        _goal_vectors[key] = np.ascontiguousarray(vectors, dtype=np.float16)
+    return _goal_vectors[key]
+
+# Persona models keyed by their static prefix, with the time their cache expires
+_persona_models: Dict[str, Tuple["genai.GenerativeModel", float]] = {}
+
+def get_persona_model(static_prefix: str) -> "genai.GenerativeModel":
+    """
+    Returns a model that carries the given static prefix as its system instruction.
+    When the prefix is large enough it is registered with Gemini's context cache,
+    so every turn after the first is billed at the cached-token rate. Sessions
+    with a byte-identical prefix share the same model (and cache).
+    """
+    entry = _persona_models.get(static_prefix)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+
+    genai = get_genai()
+    from google.generativeai import caching
+
+    model, expires_at = None, float("inf")
+    if GOOGLE_API_KEY and len(static_prefix) // 4 >= CACHE_MIN_TOKENS:
+        try:
+            cached = caching.CachedContent.create(
+                model=f"models/{MODEL_NAME}",
+                system_instruction=static_prefix,
+                ttl=datetime.timedelta(seconds=CACHE_TTL_SECONDS),
+            )
+            model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+            # Refresh a little early so no request races the cache expiry
+            expires_at = time.monotonic() + CACHE_TTL_SECONDS - 30
+        except Exception as e:
+            log.warning("Context cache unavailable, sending system instruction inline: %s", e)
+
+    if model is None:
+        model = genai.GenerativeModel(MODEL_NAME, system_instruction=static_prefix)
+    _persona_models[static_prefix] = (model, expires_at)
+    return model
+
+def build_keyword_matcher(goal_keywords: List[FrozenSet[str]]) -> Callable[[str], Set[int]]:
+    """
+    Compiles the goal keywords into a single matcher, so a response is scanned once
+    instead of once per keyword.
+
+    Args:
+        goal_keywords (List[FrozenSet[str]]): Lowercased keywords for each goal.
+
+    Returns:
+        Callable[[str], Set[int]]: Maps lowercased text to the indexes of goals with a keyword in it.
+    """
+    # A keyword can be shared by several goals
+    keyword_goals: Dict[str, Set[int]] = {}
+    for idx, keywords in enumerate(goal_keywords):
+        for keyword in keywords:
+            keyword_goals.setdefault(keyword, set()).add(idx)
+
+    if not keyword_goals:
+        return lambda text: set()
+
+    if ahocorasick is not None:
+        automaton = ahocorasick.Automaton()
+        for keyword, goals in keyword_goals.items():
+            automaton.add_word(keyword, frozenset(goals))
+        automaton.make_automaton()
+        # The automaton reports every occurrence, including overlapping ones
+        return lambda text: set().union(*(goals for _, goals in automaton.iter(text)))
+
+    # Fallback: one regex tried at every position. It only reports the longest keyword
+    # starting there, so each keyword also stands for the keywords it contains.
+    contained_goals = {
+        keyword: set().union(*(goals for other, goals in keyword_goals.items() if other in keyword))
+        for keyword in keyword_goals
+    }
+    alternatives = "|".join(map(re.escape, sorted(keyword_goals, key=len, reverse=True)))
+    pattern = re.compile(f"(?=({alternatives}))")
+    return lambda text: set().union(*(contained_goals[m.group(1)] for m in pattern.finditer(text)))
+
+async def get_persona_model_async(static_prefix: str) -> "genai.GenerativeModel":
+    """
+    Async version of `get_persona_model`. Creating or refreshing a context cache is a
+    blocking network call, so it runs in a worker thread instead of on the event loop.
+    """
+    entry = _persona_models.get(static_prefix)
+    if entry and entry[1] > time.monotonic():
+        return entry[0]
+    return await asyncio.to_thread(get_persona_model, static_prefix)
 
 # --- Removed the top-level get_gemini_response function as it's now handled by the class ---
 # Also removed MockGeminiAPI as you're using real Gemini API calls.
 
+# Once the history resent with each turn grows past this (estimated) many tokens,
+# its oldest half is replaced by a summary
+HISTORY_TOKEN_BUDGET = 2000
+SUMMARY_PROMPT = (
+    "Summarize the following dialogue between a customer (model) and a PR representative "
+    "(user, whose messages also carry instructions for the customer) in at most 150 words. "
+    "Preserve the facts that were stated and the customer's questions that are still open.\n\n"
+)
+
+# Fixed pieces of the per-turn prompt
+ALL_ANSWERED_DIRECTIVE = "Your next action: You have received answers to all your questions. End the chat politely and professionally.\n"
+RESPONSE_CUE = "Your response (as the customer):"
+# Sent without calling Gemini once the customer has already said goodbye
+CHAT_ENDED_REPLY = "Thanks again, I have everything I need. Goodbye!"
+
+def build_system_prompt(chat_actor: Dict[str, Any]) -> str:
+    """
+    Builds the system instruction for a persona. It only depends on the chat actor,
+    so callers that keep scenarios around can build it once and pass it to
+    `GeminiChatSession` as `prebuilt_system_prompt`.
+    """
+    return (
+        f"You are a customer named '{chat_actor['customerName']}'. Your backstory is: '{chat_actor['backstory']}'.\n"
+        f"Your current goal is to get answers to the following questions: {'; '.join(chat_actor['goalQuestions'])}.\n"
+        f"Maintain a {chat_actor['tone']} tone throughout the conversation.\n"
+        "Simulate a conversation with a public relationship representative regarding the issue provided in a backstory. Do not break character."
+        "Your responses should be concise and directly address the conversation flow. Use a natural, causal language to make conversation more realistic. \n"
+    )
+
 class GeminiChatSession:
     """
     Manages a single chat session with the Gemini model, acting as a customer
     trying to achieve specific goals.
     """
 
-    def __init__(self, session_id: str, chat_actor: Dict[str, Any]):
+    # Thousands of sessions can be live per worker, so they carry no per-instance __dict__
+    __slots__ = (
+        "session_id", "service_tier", "name", "backstory", "tone", "goal_questions",
+        "goals_answered_mask", "_all_goals_mask", "chat_history", "farewell_sent",
+        "_goal_keywords", "_match_goals", "_static_prefix", "_scenario_key",
+        "_goal_directives", "_chat", "_turn_lock", "_context_key", "_reply_ok",
+    )
+
+    def __init__(self, session_id: str, chat_actor: Dict[str, Any], service_tier: ServiceTier = 'standard',
+                 scenario_id: Optional[str] = None, prebuilt_system_prompt: Optional[str] = None):
         """
         Initializes the chat session with its persona and goals.
 
@@ -43,127 +388,412 @@ class GeminiChatSession:
             backstory (str): The backstory/context for the AI customer.
             tone (str): The desired tone of the AI customer (e.g., "polite", "frustrated", "neutral").
             goal_questions (List[str]): A list of questions the AI customer needs to ask/get answers for.
+            service_tier (ServiceTier): 'priority' for live chats, 'flex' for offline evaluation runs.
+            scenario_id (Optional[str]): The scenario this session runs. Sessions of the same
+                scenario share cached replies; without it sessions with the same persona do.
+            prebuilt_system_prompt (Optional[str]): The result of `build_system_prompt(chat_actor)`,
+                if the caller already has it.
         """
         self.session_id = session_id
+        self.service_tier = service_tier
         self.name = chat_actor["customerName"]
         self.backstory = chat_actor["backstory"]
         self.tone = chat_actor["tone"]
         self.goal_questions = chat_actor["goalQuestions"]
-        self.goals_answered: List[bool] = [False] * len(self.goal_questions)
+        # Goal status packed into one int: bit i is set once goal i has been answered
+        self.goals_answered_mask = 0
+        self._all_goals_mask = (1 << len(self.goal_questions)) - 1
         self.chat_history: List[Dict[str, str]] = []
-        self.current_question_index = 0 # Helps guide which question to ask next if not answered
-        self.asked_questions = set()
+        # Set once the customer has replied with all goals answered, i.e. said goodbye
+        self.farewell_sent = False
+        # Whether the last reply came from Gemini (or a cache) rather than a fallback message
+        self._reply_ok = False
+        # Held for a whole turn, so overlapping requests for the same session (a double
+        # submit, a client retry) take turns instead of interleaving in the chat history
+        self._turn_lock = asyncio.Lock()
+
+        # Goal keywords are fixed for the session, so they are lowered, split and
+        # compiled once (short words are skipped as too common to be meaningful)
+        self._goal_keywords: List[FrozenSet[str]] = [
+            frozenset(keyword for keyword in goal_q.lower().split() if len(keyword) > 3)
+            for goal_q in self.goal_questions
+        ]
+        self._match_goals = build_keyword_matcher(self._goal_keywords)
+
+        # Everything that stays the same for the whole session lives in one immutable
+        # prefix. It must stay byte-identical between turns for the cache to hit.
+        self._static_prefix = prebuilt_system_prompt or build_system_prompt(chat_actor)
+        self._scenario_key = scenario_id or self._static_prefix
+        # Running key of the conversation so far for the response cache, extended after each turn
+        self._context_key = extend_context_key("", self._static_prefix)
+        # The "ask the next question" directive for each goal, formatted once
+        self._goal_directives = [
+            f"Your next action: Ask the question: '{goal_q}'.\n"
+            "Formulate your response as the customer asking this specific question, maintaining your tone.\n"
+            for goal_q in self.goal_questions
+        ]
+
+        # Gemini's chat session keeps the typed turn history, so each call only
+        # sends the new turn instead of re-rendering the whole conversation.
+        # The model is swapped for the shared (possibly cached) persona model before each
+        # send; resolving that here could block the event loop on cache creation.
+        self._chat = get_genai().GenerativeModel(MODEL_NAME, system_instruction=self._static_prefix).start_chat(history=[])
         # print(f"Session {self.session_id} initialized. Goals: {self.goal_questions}")
 
+    @property
+    def goals_answered(self) -> List[bool]:
+        """
+        The goal status as one boolean per goal question.
+        """
+        return [bool(self.goals_answered_mask >> i & 1) for i in range(len(self.goal_questions))]
+
+    @property
+    def all_goals_answered(self) -> bool:
+        return self.goals_answered_mask == self._all_goals_mask
+
+    @property
+    def current_question_index(self) -> int:
+        """
+        Index of the first unanswered goal, or len(goal_questions) when all are answered.
+        """
+        unanswered = ~self.goals_answered_mask & self._all_goals_mask
+        # Isolate the lowest set bit and take its position
+        return (unanswered & -unanswered).bit_length() - 1 if unanswered else len(self.goal_questions)
+
     async def start_new_chat_session(self):
         """
         Starts a new chat session by sending a system instruction to the model
         and retrieving the first message from the AI.
         """
+        # Persona, tone and goals are already in the system instruction
         initial_prompt = (
-            f"You are a customer with the following backstory: {self.backstory}. "
-            f"Your tone is {self.tone}. "
-            #f"Your long-term goal is to get information about the following topics: {', '.join(self.goal_questions)}. "
             "Your goal is to get more information from the PR agent."
             "Please start the conversation. Just give your first message to the agent."
         )
 
-        initial_response = await self._call_gemini_api(prompt=initial_prompt)
-
-        self.chat_history.append({"role": self.name, "text": initial_response})
+        async with self._turn_lock:
+            initial_response = await self._call_gemini_api(prompt=initial_prompt)
+            self.chat_history.append({"role": self.name, "text": initial_response})
         
         # We process the response to get the initial AI message and check goals
         return {
             "ai_response": initial_response,
-            "goals_answered": self.goals_answered # Return the boolean list
+            "goals_answered": self.goals_answered, # Return the boolean list
+            "goals_answered_mask": self.goals_answered_mask,
         }
 
-    async def _call_gemini_api(self, prompt: str) -> str:
+    async def _call_gemini_api(self, prompt: str, customer_service_response: str = "",
+                               message_vector: Optional[np.ndarray] = None) -> str:
         """
         Calls the actual Gemini API to generate a response.
+
+        Args:
+            prompt (str): The prompt for this turn.
+            customer_service_response (str): The message being replied to, used to look up
+                replies other sessions of the scenario got for a similar message.
+            message_vector (Optional[np.ndarray]): The message's embedding, if already computed.
+
+        On failure a fallback message is returned instead and `_reply_ok` is left False.
         """
-        # Simulate network delay for a more realistic feel in a demo
-        time.sleep(random.uniform(0.1, 0.5)) # Reduced delay for web interaction
+        self._reply_ok = False
+        # Optional simulated network delay for offline demos (off by default, it only adds latency)
+        if SIMULATE_DELAY:
+            await asyncio.sleep(random.uniform(0.1, 0.5))
 
         if not GOOGLE_API_KEY:
-            print("Gemini API key is not set. Cannot make API call.")
+            log.error("Gemini API key is not set. Cannot make API call.")
             return "AI service is not available (API key missing)."
 
         try:
-            # Use the actual Gemini API call
-            # For multi-turn conversations, you might want to use model.start_chat()
-            # and pass history, but for this structured prompt approach, generate_content works.
-            response = await gemini_model.generate_content_async(prompt)
-            return response.text
+            # The model is looked up again in case its context cache has been refreshed
+            self._chat.model = await get_persona_model_async(self._static_prefix)
+            reply, reply_vector = await self._lookup_reply(customer_service_response, message_vector)
+            if reply is not None:
+                self._record_turn(prompt, reply)
+                self._reply_ok = True
+                return reply
+
+            if response_cache is None:
+                response_text = await self._send_to_chat(prompt)
+            else:
+                response_text, cached = await response_cache.get_or_generate(
+                    self._context_key, prompt, lambda: self._send_to_chat(prompt)
+                )
+                if cached:
+                    # The chat session only records turns it sent itself
+                    self._record_turn(prompt, response_text)
+
+            if reply_cache is not None:
+                reply_cache.store(self._scenario_key, self.current_question_index, response_text, reply_vector)
+            self._reply_ok = True
+            return response_text
         except Exception as e:
-            print(f"Error calling Gemini API for session {self.session_id}: {e}")
+            log.error("Error calling Gemini API for session %s: %s", self.session_id, e)
+            self._discard_unfinished_turn()
             return "I'm sorry, I'm having trouble connecting to the AI right now. Please try again later."
 
+    async def _stream_gemini_api(self, prompt: str, customer_service_response: str = "",
+                                 message_vector: Optional[np.ndarray] = None) -> AsyncIterator[str]:
+        """
+        Streaming counterpart of `_call_gemini_api`: yields the response text in chunks
+        as Gemini generates it. Cached responses are yielded as a single chunk.
+        `_reply_ok` is set once the whole response has arrived.
+        """
+        self._reply_ok = False
+        # Optional simulated network delay for offline demos
+        if SIMULATE_DELAY:
+            await asyncio.sleep(random.uniform(0.1, 0.5))
+
+        if not GOOGLE_API_KEY:
+            log.error("Gemini API key is not set. Cannot make API call.")
+            yield "AI service is not available (API key missing)."
+            return
+
+        chunks = []
+        try:
+            # The model is looked up again in case its context cache has been refreshed
+            self._chat.model = await get_persona_model_async(self._static_prefix)
+            reply, reply_vector = await self._lookup_reply(customer_service_response, message_vector)
+            if reply is not None:
+                self._record_turn(prompt, reply)
+                self._reply_ok = True
+                yield reply
+                return
+
+            context_key = self._context_key
+            if response_cache is not None:
+                cached = response_cache.lookup(context_key, prompt)
+                if cached is not None:
+                    # The chat session only records turns it sent itself
+                    self._record_turn(prompt, cached)
+                    if reply_cache is not None:
+                        reply_cache.store(self._scenario_key, self.current_question_index, cached, reply_vector)
+                    self._reply_ok = True
+                    yield cached
+                    return
+
+            async with stream_gemini_with_retry(
+                lambda: self._chat.send_message_async(
+                    prompt, stream=True, request_options=SERVICE_TIER_REQUEST_OPTIONS[self.service_tier]
+                ),
+                self._prompt_chars(prompt),
+            ) as response:
+                finished = False
+                try:
+                    async for chunk in response:
+                        try:
+                            chunk_text = chunk.text
+                        except ValueError:
+                            # A chunk without text, e.g. the one carrying a safety stop
+                            continue
+                        chunks.append(chunk_text)
+                        yield chunk_text
+                    finished = True
+                finally:
+                    if not finished:
+                        # Cut short (client gone or stream error): the chat session still holds the
+                        # unfinished response and every read of its history would raise
+                        self._chat.rewind()
+            if self._discard_unfinished_turn():
+                raise RuntimeError("the response was blocked or broken")
+
+            response_text = "".join(chunks)
+            self._advance_context(prompt, response_text)
+            if response_cache is not None:
+                response_cache.store(context_key, prompt, response_text)
+            if reply_cache is not None:
+                reply_cache.store(self._scenario_key, self.current_question_index, response_text, reply_vector)
+            self._reply_ok = True
+        except Exception as e:
+            log.error("Error calling Gemini API for session %s: %s", self.session_id, e)
+            # Once part of the reply has been sent, appending an apology would only garble it
+            if not chunks:
+                yield "I'm sorry, I'm having trouble connecting to the AI right now. Please try again later."
+
+    async def _lookup_reply(self, customer_service_response: str,
+                            message_vector: Optional[np.ndarray] = None) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Looks for the reply another session of this scenario got to a similar message
+        while asking the same goal question. Returns the reply (None on a miss) and the
+        message embedding to store the new reply under.
+        """
+        if reply_cache is None or not customer_service_response:
+            return None, None
+        return await reply_cache.lookup(
+            self._scenario_key, self.current_question_index, customer_service_response, message_vector
+        )
+
+    async def _send_to_chat(self, prompt: str) -> str:
+        """
+        Sends the prompt through the chat session. The persona prefix is carried by
+        the model and the session appends the turn to its history once the reply arrives.
+        """
+        response = await call_gemini_with_retry(
+            lambda: self._chat.send_message_async(
+                prompt, request_options=SERVICE_TIER_REQUEST_OPTIONS[self.service_tier]
+            ),
+            self._prompt_chars(prompt),
+        )
+        self._advance_context(prompt, response.text)
+        return response.text
+
+    def _prompt_chars(self, prompt: str) -> int:
+        """
+        Approximate size of a request: the persona, the history resent with it and the new prompt.
+        """
+        return len(self._static_prefix) + self._history_chars() + len(prompt)
+
+    def _history_chars(self) -> int:
+        """
+        Size of the history the chat session resends with every turn.
+        """
+        return sum(len(part.text) for c in self._chat.history for part in c.parts)
+
+    async def _compact_history(self):
+        """
+        Keeps the history resent with each turn within HISTORY_TOKEN_BUDGET (at ~4 characters
+        per token) by replacing its oldest half with a short summary. Only the history after
+        the static prefix changes, so the cached system instruction keeps hitting.
+        `chat_history` keeps the full transcript.
+        """
+        history = self._chat.history
+        if self._history_chars() // 4 <= HISTORY_TOKEN_BUDGET or len(history) < 4:
+            return
+
+        # Cut on a user turn so the kept history still alternates user/model
+        cut = len(history) // 2
+        cut -= cut % 2
+        dropped, kept = history[:cut], history[cut:]
+        transcript = "\n".join(f"{c.role}: {part.text}" for c in dropped for part in c.parts)
+        try:
+            response = await call_gemini_with_retry(
+                lambda: get_model().generate_content_async(SUMMARY_PROMPT + transcript),
+                len(SUMMARY_PROMPT) + len(transcript),
+            )
+            summary = response.text
+        except Exception as e:
+            log.error("Error summarizing history for session %s: %s", self.session_id, e)
+            return
+
+        # Gemini has no system role inside contents, so the summary leads the first kept user turn
+        first_text = "".join(part.text for part in kept[0].parts)
+        self._chat.history = [
+            {"role": kept[0].role, "parts": [f"[Summary of the conversation so far] {summary}\n\n{first_text}"]},
+            *kept[1:],
+        ]
+
+    def _record_turn(self, prompt: str, ai_response: str):
+        """
+        Appends an exchange that was generated outside the chat session (e.g. by a
+        batch job or served from the response cache) to its history.
+        """
+        self._chat.history = self._chat.history + [
+            {"role": "user", "parts": [prompt]},
+            {"role": "model", "parts": [ai_response]},
+        ]
+        self._advance_context(prompt, ai_response)
+
+    def _advance_context(self, prompt: str, ai_response: str):
+        """
+        Extends the response cache's context key with a turn that has joined the chat history.
+        History compaction leaves it as is: a summarized context stands for the same conversation.
+        """
+        self._context_key = extend_context_key(self._context_key, prompt, ai_response)
+
+    def _discard_unfinished_turn(self) -> bool:
+        """
+        Drops the last exchange from the chat session if its response is unfinished or was
+        stopped (e.g. by a safety filter). Until then every read of the session's history
+        raises, which would break all later turns.
+
+        Returns:
+            bool: Whether a turn was dropped.
+        """
+        try:
+            self._chat.history
+        except Exception as e:
+            log.warning("Dropping an unfinished turn from session %s: %s", self.session_id, e)
+            self._chat.rewind()
+            return True
+        return False
+
+    def _batch_request(self, prompt: str) -> Dict[str, Any]:
+        """
+        Builds the GenerateContentRequest for the next turn in the JSON form used by
+        Batch API input files. Batch requests are standalone, so the static prefix
+        and all earlier turns are included.
+        """
+        contents = [
+            {"role": c.role, "parts": [{"text": part.text} for part in c.parts]}
+            for c in self._chat.history
+        ]
+        contents.append({"role": "user", "parts": [{"text": prompt}]})
+        return {
+            "system_instruction": {"parts": [{"text": self._static_prefix}]},
+            "contents": contents,
+        }
+
     def _construct_prompt(self, last_customer_service_response: str = "") -> str:
         """
-        Constructs the prompt for the Gemini model to generate the AI customer's next message.
-        Incorporates the AI customer's persona, chat history, and current goal status.
+        Constructs the per-turn prompt for the Gemini model to generate the AI customer's next message.
+        Only the delta is returned: the persona lives in the static prefix and earlier
+        turns have already been sent, so this is just the latest message and the next action.
 
         Args:
             last_customer_service_response (str): The most recent message from the human user (Customer Service).
 
         Returns:
-            str: The complete prompt string for the Gemini model.
+            str: The prompt string for this turn.
         """
-        prompt = f"You are a customer named '{self.name}'. Your backstory is: '{self.backstory}'.\n"
-        prompt += f"Your current goal is to get answers to the following questions: {'; '.join(self.goal_questions)}.\n"
-        prompt += f"Maintain a {self.tone} tone throughout the conversation.\n"
-        prompt += "Simulate a conversation with a public relationship representative regarding the issue provided in a backstory. Do not break character."
-        prompt += "Your responses should be concise and directly address the conversation flow. Use a natural, causal language to make conversation more realistic. \n"
-
-        # Add chat history
-        if self.chat_history:
-            prompt += "\n--- Conversation History ---\n"
-            for entry in self.chat_history:
-                prompt += f"{entry['role']}: {entry['text']}\n"
-            prompt += "--------------------------\n"
+        parts = []
 
         # Add the latest customer service response if available
         if last_customer_service_response:
-            prompt += f"Customer Service: {last_customer_service_response}\n"
-
-        # Guidance for the AI based on goals
-        unanswered_goals = [self.goal_questions[i] for i, answered in enumerate(self.goals_answered) if not answered]
+            parts.append(f"Customer Service: {last_customer_service_response}\n")
 
-        if unanswered_goals:
-            # Prioritize asking unanswered questions if the current one hasn't been addressed
-            if self.current_question_index < len(self.goal_questions) and not self.goals_answered[self.current_question_index]:
-                prompt += f"Your next action: Ask the question: '{self.goal_questions[self.current_question_index]}'.\n"
-                prompt += "Formulate your response as the customer asking this specific question, maintaining your tone.\n"
-            else:
-                # If current question is answered or index out of bounds, try to find the next unanswered one
-                for i, answered in enumerate(self.goals_answered):
-                    if not answered:
-                        self.current_question_index = i # Move pointer to next unanswered goal
-                        prompt += f"Your next action: Ask the question: '{self.goal_questions[self.current_question_index]}'.\n"
-                        prompt += "Formulate your response as the customer asking this specific question, maintaining your tone.\n"
-                        break
-                else:
-                    # Fallback if somehow all goals are true but loop didn't catch, or just engage
-                    prompt += "Your next action: You have asked all your questions, but are you satisfied with the answers? Respond to the last customer service message, or conclude the conversation politely.\n"
+        # Guidance for the AI based on goals: ask the first unanswered question
+        if not self.all_goals_answered:
+            parts.append(self._goal_directives[self.current_question_index])
         else:
-            prompt += "Your next action: You have received answers to all your questions. End the chat politely and professionally.\n"
+            parts.append(ALL_ANSWERED_DIRECTIVE)
+
+        parts.append(RESPONSE_CUE)
+        return "".join(parts)
 
-        prompt += "Your response (as the customer):"
-        return prompt
+    async def _embed_message(self, customer_service_response: str) -> Optional[np.ndarray]:
+        """
+        Embeds the normalized customer service message for goal detection and the reply
+        cache, making sure the goal embeddings exist first. None if embeddings are unavailable.
+        """
+        if not GOOGLE_API_KEY:
+            return None
+        # Nothing left to match goals against and no reply cache to look up
+        if self.all_goals_answered and reply_cache is None:
+            return None
+        if await get_goal_vectors(self.goal_questions) is None:
+            return None
+        return await embed(normalize_message(customer_service_response))
 
-    def _update_goal_status(self, customer_service_response: str):
+    def _update_goal_status(self, customer_service_response: str, message_vector: Optional[np.ndarray] = None):
         """
         Checks the customer service response against the goal questions
         and updates the `goals_answered` status.
+
+        With the message's embedding, a goal is answered when it is similar enough to the
+        goal question (one matrix-vector product for all goals). Without it, it falls back
+        to keyword matching.
         """
-        for i, goal_q in enumerate(self.goal_questions):
-            if not self.goals_answered[i]: # Only check if not already answered
-                # Simple keyword matching for demo. In real scenario, use NLP.
-                keywords = goal_q.lower().split()
-                if any(keyword in customer_service_response.lower() for keyword in keywords if len(keyword) > 3): # Avoid very short common words
-                    self.goals_answered[i] = True
-                    # print(f"[DEBUG: Session {self.session_id}]: Goal '{goal_q}' marked as answered.")
+        goal_vectors = _goal_vectors.get(tuple(self.goal_questions)) if message_vector is not None else None
+        if goal_vectors is not None:
+            # Upcast for the product so it runs as a float32 GEMV
+            hits = np.flatnonzero(goal_vectors.astype(np.float32) @ message_vector >= GOAL_SIMILARITY_THRESHOLD)
+        else:
+            hits = self._match_goals(customer_service_response.lower())
+
+        hits_mask = 0
+        for i in hits:
+            hits_mask |= 1 << int(i)
+        self.goals_answered_mask |= hits_mask
 
     async def send_message(self, customer_service_response: str) -> Dict[str, any]:
         """
@@ -177,30 +807,245 @@ class GeminiChatSession:
             Dict[str, any]: A dictionary containing the AI customer's response and
                             the current status of goals answered.
         """
+        async with self._turn_lock:
+            if self.farewell_sent:
+                # Goals can't change any more and the customer has ended the chat
+                self._prepare_turn(customer_service_response)
+                return self._finish_turn(CHAT_ENDED_REPLY)
+
+            # A turn that broke before its response was complete must not lock up the session
+            self._discard_unfinished_turn()
+            # Compaction and the embedding are independent, so their requests overlap
+            _, message_vector = await asyncio.gather(
+                self._compact_history(), self._embed_message(customer_service_response)
+            )
+
+            # 1-3. Record the message, update goals and build the prompt
+            prompt = self._prepare_turn(customer_service_response, message_vector)
+
+            # 4. Get AI customer's response from Gemini
+            ai_customer_message = await self._call_gemini_api(prompt, customer_service_response, message_vector)
+
+            # 5-6. Add AI customer's response to history and return it with goal status
+            return self._finish_turn(ai_customer_message, replied=self._reply_ok)
+
+    async def send_message_stream(self, customer_service_response: str) -> AsyncIterator[str]:
+        """
+        Same as `send_message`, but yields the AI customer's response in chunks as it is
+        generated, so callers can forward it before generation finishes. The full
+        response is added to the history once the stream ends; goal status is
+        available from `goals_answered`.
+
+        Args:
+            customer_service_response (str): The message from the human user.
+
+        Yields:
+            str: Consecutive pieces of the AI customer's response.
+        """
+        async with self._turn_lock:
+            if self.farewell_sent:
+                self._prepare_turn(customer_service_response)
+                self._finish_turn(CHAT_ENDED_REPLY)
+                yield CHAT_ENDED_REPLY
+                return
+
+            self._discard_unfinished_turn()
+            _, message_vector = await asyncio.gather(
+                self._compact_history(), self._embed_message(customer_service_response)
+            )
+            prompt = self._prepare_turn(customer_service_response, message_vector)
+
+            chunks = []
+            # Closed explicitly, so a stream abandoned mid-way is cleaned up before the lock is released
+            async with aclosing(self._stream_gemini_api(prompt, customer_service_response, message_vector)) as stream:
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield chunk
+
+            self._finish_turn("".join(chunks), replied=self._reply_ok)
+
+    def _prepare_turn(self, customer_service_response: str, message_vector: Optional[np.ndarray] = None) -> str:
+        """
+        Records the human user's message, updates goal status and returns the
+        prompt for the AI customer's reply. Goals are matched by embedding when
+        `message_vector` is given and by keyword otherwise (e.g. in batch runs).
+        """
         # 1. Add human user's message to history
         self.chat_history.append({"role": "Customer Service", "text": customer_service_response})
 
         # 2. Update goal status based on human user's response
-        self._update_goal_status(customer_service_response)
+        self._update_goal_status(customer_service_response, message_vector)
 
         # 3. Construct prompt for AI customer's response
-        prompt = self._construct_prompt(customer_service_response)
-
-        # 4. Get AI customer's response from Gemini
-        ai_customer_message = await self._call_gemini_api(prompt)
+        return self._construct_prompt(customer_service_response)
 
+    def _finish_turn(self, ai_customer_message: str, replied: bool = True) -> Dict[str, any]:
+        """
+        Adds the AI customer's reply to the history and returns the turn result.
+        `replied` is False when the message is a fallback rather than the customer's reply.
+        """
         # 5. Add AI customer's response to history
         self.chat_history.append({"role": self.name, "text": ai_customer_message})
+        # A reply to a turn with every goal answered is the customer's goodbye; a fallback
+        # message is not, so the next turn gets to say it
+        if replied and self.all_goals_answered:
+            self.farewell_sent = True
 
         # 6. Return response and goal status
         return {
             "ai_response": ai_customer_message,
-            "goals_answered": self.goals_answered # Return the boolean list
+            "goals_answered": self.goals_answered, # Return the boolean list
+            "goals_answered_mask": self.goals_answered_mask,
         }
 
+
+async def run_many(sessions: List[GeminiChatSession], cs_messages: List[str]) -> List[Dict[str, Any]]:
+    """
+    Sends one customer service message to each session concurrently. All sessions
+    share the module-level model and the semaphore bounds the calls in flight.
+
+    Args:
+        sessions (List[GeminiChatSession]): Independent sessions to advance by one turn.
+        cs_messages (List[str]): The message for each session, in the same order.
+
+    Returns:
+        List[Dict[str, Any]]: The `send_message` result for each session, in order.
+    """
+    return await asyncio.gather(*[session.send_message(msg) for session, msg in zip(sessions, cs_messages)])
+
+
+# Terminal states of a Gemini batch job
+BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+def batch_simulate(sessions: List[GeminiChatSession], scripted_cs_turns: List[List[str]], poll_seconds: int = 30) -> List[List[Dict[str, Any]]]:
+    """
+    Runs scripted customer service turns against many sessions through the Gemini
+    Batch API, which is billed at half the interactive price. Meant for offline
+    evaluation runs where results may take minutes to hours.
+
+    Each customer reply depends on the previous one, so every round batches one
+    turn across all sessions instead of several turns of the same session.
+
+    Args:
+        sessions (List[GeminiChatSession]): The sessions to drive.
+        scripted_cs_turns (List[List[str]]): The customer service messages for each session, in order.
+        poll_seconds (int): How often to poll the batch job for completion.
+
+    Returns:
+        List[List[Dict[str, Any]]]: The per-turn results for each session, as returned by `send_message`.
+    """
+    # The batch endpoints are only available in the newer google-genai client
+    from google import genai as genai_client
+
+    client = genai_client.Client(api_key=GOOGLE_API_KEY)
+    results: List[List[Dict[str, Any]]] = [[] for _ in sessions]
+    rounds = max((len(turns) for turns in scripted_cs_turns), default=0)
+
+    for turn in range(rounds):
+        pending: Dict[str, Tuple[int, str]] = {}
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+            for i, (session, turns) in enumerate(zip(sessions, scripted_cs_turns)):
+                if turn >= len(turns):
+                    continue
+                if session.farewell_sent:
+                    session._prepare_turn(turns[turn])
+                    results[i].append(session._finish_turn(CHAT_ENDED_REPLY))
+                    continue
+                key = f"{session.session_id}-{turn}"
+                prompt = session._prepare_turn(turns[turn])
+                pending[key] = (i, prompt)
+                f.write(json.dumps({"key": key, "request": session._batch_request(prompt)}) + "\n")
+        if not pending:
+            os.remove(f.name)
+            continue
+        try:
+            uploaded = client.files.upload(file=f.name, config={"display_name": f"prsim-round-{turn}", "mime_type": "jsonl"})
+        finally:
+            os.remove(f.name)
+
+        job = client.batches.create(model=MODEL_NAME, src=uploaded.name, config={"display_name": f"prsim-round-{turn}"})
+        while job.state.name not in BATCH_DONE_STATES:
+            time.sleep(poll_seconds)
+            job = client.batches.get(name=job.name)
+        if job.state.name != "JOB_STATE_SUCCEEDED":
+            raise RuntimeError(f"Batch job {job.name} ended in state {job.state.name}")
+
+        outputs: Dict[str, Dict[str, Any]] = {}
+        for line in client.files.download(file=job.dest.file_name).decode("utf-8").splitlines():
+            if line.strip():
+                item = json.loads(line)
+                outputs[item["key"]] = item
+
+        # Output order is not guaranteed, so results are matched back by key
+        for key, (i, prompt) in pending.items():
+            replied = True
+            try:
+                ai_customer_message = outputs[key]["response"]["candidates"][0]["content"]["parts"][0]["text"]
+                sessions[i]._record_turn(prompt, ai_customer_message)
+            except (KeyError, IndexError):
+                replied = False
+                log.error("Batch job %s returned no response for %s: %s", job.name, key, outputs.get(key, {}).get('error'))
+                ai_customer_message = "I'm sorry, I'm having trouble connecting to the AI right now. Please try again later."
+            results[i].append(sessions[i]._finish_turn(ai_customer_message, replied))
+
+    return results
+
+# Prompt templates for the one-off feedback and sentiment calls. They are compiled once at
+# import; rendering runs the compiled code, which joins the pieces (including the
+# transcript loop) in one pass. Missing values raise instead of rendering as blanks.
+_prompt_env = Environment(autoescape=False, keep_trailing_newline=True, undefined=StrictUndefined)
+
+FEEDBACK_TEMPLATE = _prompt_env.from_string(
+    "You are an expert PR and communications consultant tasked with evaluating a user's performance in a simulated PR crisis chat. "
+    "Your role is to provide constructive feedback based on the following conversation and scenario details. "
+    "The user's goal was to address all of the customer's concerns, which are listed as 'goalQuestions'.\n\n"
+    "--- Scenario Details ---\n"
+    "Customer Name: {{ actor.customerName }}\n"
+    "Customer Backstory: {{ actor.backstory }}\n"
+    "Customer Tone: {{ actor.tone }}\n"
+    "Customer's Goals (questions the user needed to address): {{ actor.goalQuestions }}\n\n"
+    "--- Conversation Transcript ---\n"
+    "{% set bot_label = actor.customerName ~ ' (Customer Bot)' %}"
+    "{% for message in history %}"
+    "{{ 'User (Customer Service)' if message.sender == 'user' else bot_label }}: {{ message.text }}\n"
+    "{% endfor %}"
+    "\n--- Feedback Request ---\n"
+    "Please provide your feedback using the exact following structure. Each section must be on a new line.\n"
+    "Start with a summary of the user's overall performance.\n\n"
+    "**Goal Achievement**\n"
+    "Did the user successfully address all of the customer's goal questions? List which ones were addressed and which were missed.\n\n"
+    "**Tone and Empathy**\n"
+    "Was the user's tone appropriate for a PR crisis? Did they sound empathetic and professional?\n\n"
+    "**Strategy**\n"
+    "Did the user seem to have a clear strategy or did they react impulsively? What was their overall effectiveness?\n\n"
+    "**Areas for Improvement**\n"
+    "Provide specific, actionable advice on how the user could have handled the conversation better. Suggest better phrasing or strategic approaches.\n"
+)
+
+SENTIMENT_TEMPLATE = _prompt_env.from_string("""
+        **Context:** You are a social media sentiment analysis expert. Your task is to analyze a social media post and predict the sentiment of the audience.
+        
+        **Scenario Details:**
+        - **Crisis:** {{ scenario_title }}
+        - **Initial Facts:** {{ initial_facts }}
+        - **Target Audience:** The general public, brand followers, and media.
+
+        **Social Media Post to Analyze:**
+        **Title:** {{ post_title }}
+        **Content:** {{ post_content }}
+
+        **Your Task:**
+        Based on the provided context and the social media post content, provide a concise sentiment analysis. Specifically, answer the following questions:
+        1.  **Overall Sentiment:** What is the overall sentiment of the post's content?
+        2.  **Predicted Audience Reaction:** Given the crisis context, what sentiment or reaction will the target audience likely have after reading this post?
+        3.  **Suggestions:** Briefly suggest a single, specific improvement to the post to achieve a more positive or neutral reaction.
+        
+        Format your response as a simple, easy-to-read summary. Do not include any preambles or conversational text.
+        """)
+
 #feedback handler   
 async def get_feedback_from_model(history: list, scenario_details: dict) -> str:
-    print(f"DEBUG_SERVICE: Starting get_feedback_from_model...")
+    log.debug("Starting get_feedback_from_model...")
     if not GOOGLE_API_KEY:
         return "Unable to provide feedback: Gemini API key is not configured."
     
@@ -209,100 +1054,100 @@ async def get_feedback_from_model(history: list, scenario_details: dict) -> str:
     except KeyError:
         return "Feedback could not be generated. Scenario data is missing the 'chatActor' key."
 
-    prompt = (
-        f"You are an expert PR and communications consultant tasked with evaluating a user's performance in a simulated PR crisis chat. "
-        f"Your role is to provide constructive feedback based on the following conversation and scenario details. "
-        f"The user's goal was to address all of the customer's concerns, which are listed as 'goalQuestions'.\n\n"
-        f"--- Scenario Details ---\n"
-        f"Customer Name: {customer_details['customerName']}\n"
-        f"Customer Backstory: {customer_details['backstory']}\n"
-        f"Customer Tone: {customer_details['tone']}\n"
-        f"Customer's Goals (questions the user needed to address): {customer_details['goalQuestions']}\n\n"
-        f"--- Conversation Transcript ---\n"
-    )
-
-    for message in history:
-        sender_label = "User (Customer Service)" if message['sender'] == 'user' else f"{customer_details['customerName']} (Customer Bot)"
-        prompt += f"{sender_label}: {message['text']}\n"
-
-    prompt += (
-        f"\n--- Feedback Request ---\n"
-        f"Please provide your feedback using the exact following structure. Each section must be on a new line.\n"
-        f"Start with a summary of the user's overall performance.\n\n"
-        f"**Goal Achievement**\n"
-        f"Did the user successfully address all of the customer's goal questions? List which ones were addressed and which were missed.\n\n"
-        f"**Tone and Empathy**\n"
-        f"Was the user's tone appropriate for a PR crisis? Did they sound empathetic and professional?\n\n"
-        f"**Strategy**\n"
-        f"Did the user seem to have a clear strategy or did they react impulsively? What was their overall effectiveness?\n\n"
-        f"**Areas for Improvement**\n"
-        f"Provide specific, actionable advice on how the user could have handled the conversation better. Suggest better phrasing or strategic approaches.\n"
-    )
+    prompt = FEEDBACK_TEMPLATE.render(actor=customer_details, history=history)
 
-    print(f"DEBUG_SERVICE: Generated prompt for feedback:\n{prompt}")
+    log.debug("Generated prompt for feedback:\n%s", prompt)
 
     try:
-        response = await gemini_model.generate_content_async(prompt)
+        async with feedback_semaphore:
+            response = await call_gemini_with_retry(lambda: get_model().generate_content_async(prompt), len(prompt))
         if hasattr(response, 'text'):
-            # This is the key change: Split the text into lines and join with a newline character.
-            # This handles cases where the model provides no line breaks.
-            formatted_feedback = '\n'.join(line.strip() for line in response.text.split('.'))
-
-            # The code below is a better way to format, so I am going to use that instead.
-            # This is to handle any markdown formatting from the AI
-            # We will use this to format the text
-            formatted_feedback = response.text
-            return formatted_feedback
-            
+            # The markdown from the model is returned as is; the frontend formats it
+            return response.text
         else:
-            print(f"Error: Gemini API response did not contain a text attribute.")
+            log.error("Gemini API response did not contain a text attribute.")
             return "Failed to get a valid response from the AI model."
     except Exception as e:
-        print(f"Error calling Gemini API for feedback: {e}")
+        log.error("Error calling Gemini API for feedback: %s", e)
         return "An error occurred while communicating with the AI model."
 
-async def analyze_post_sentiment(post_title, post_content, scenario_details):
+async def get_feedback_stream(history: list, scenario_details: dict) -> AsyncIterator[str]:
     """
-    Semtiment analysis for a social media post
-    
+    Streaming counterpart of `get_feedback_from_model`: yields the feedback in chunks as
+    Gemini generates it. Errors are yielded as a message instead of raised.
     """
-    initial_facts = scenario_details['initialFacts']
-    scenario_title = scenario_details['title']
+    if not GOOGLE_API_KEY:
+        yield "Unable to provide feedback: Gemini API key is not configured."
+        return
 
-     # Construct a detailed prompt for the Gemini model
-    prompt = f"""
-        **Context:** You are a social media sentiment analysis expert. Your task is to analyze a social media post and predict the sentiment of the audience.
-        
-        **Scenario Details:**
-        - **Crisis:** {scenario_title}
-        - **Initial Facts:** {initial_facts}
-        - **Target Audience:** The general public, brand followers, and media.
+    try:
+        customer_details = scenario_details['chatActor']
+    except KeyError:
+        yield "Feedback could not be generated. Scenario data is missing the 'chatActor' key."
+        return
 
-        **Social Media Post to Analyze:**
-        **Title:** {post_title}
-        **Content:** {post_content}
+    prompt = FEEDBACK_TEMPLATE.render(actor=customer_details, history=history)
 
-        **Your Task:**
-        Based on the provided context and the social media post content, provide a concise sentiment analysis. Specifically, answer the following questions:
-        1.  **Overall Sentiment:** What is the overall sentiment of the post's content?
-        2.  **Predicted Audience Reaction:** Given the crisis context, what sentiment or reaction will the target audience likely have after reading this post?
-        3.  **Suggestions:** Briefly suggest a single, specific improvement to the post to achieve a more positive or neutral reaction.
-        
-        Format your response as a simple, easy-to-read summary. Do not include any preambles or conversational text.
-        """
+    streamed = False
+    try:
+        # The slots are held until the stream is consumed, as generation runs until then
+        async with feedback_semaphore, stream_gemini_with_retry(
+            lambda: get_model().generate_content_async(prompt, stream=True), len(prompt)
+        ) as response:
+            async for chunk in response:
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # A chunk without text, e.g. the one carrying a safety stop
+                    continue
+                streamed = True
+                yield chunk_text
+    except Exception as e:
+        log.error("Error calling Gemini API for feedback: %s", e)
+        # Once part of the feedback has been sent, appending an error would only garble it
+        if not streamed:
+            yield "An error occurred while communicating with the AI model."
+
+async def analyze_post_sentiment(post_title, post_content, scenario_details):
+    """
+    Semtiment analysis for a social media post
     
+    """
+    prompt = SENTIMENT_TEMPLATE.render(
+        scenario_title=scenario_details['title'],
+        initial_facts=scenario_details['initialFacts'],
+        post_title=post_title,
+        post_content=post_content,
+    )
+
     try:
-        response = await gemini_model.generate_content_async(prompt)
+        response = await call_gemini_with_retry(lambda: get_model().generate_content_async(prompt), len(prompt))
         if hasattr(response, 'text'):
             return response.text
         else:
-            print(f"Error: Gemini API response did not contain a text attribute.")
+            log.error("Gemini API response did not contain a text attribute.")
             return "Failed to get a valid response from the AI model."
     except Exception as e:
-        print(f"Error calling Gemini API for feedback: {e}")
+        log.error("Error calling Gemini API for feedback: %s", e)
         return "An error occurred while communicating with the AI model."
 
 
+async def review_bundle(history: list, scenario_details: dict, post_title: str, post_content: str) -> Tuple[str, str]:
+    """
+    Gets the chat feedback and the post sentiment analysis for a post-simulation review.
+    The two calls are independent, so they run concurrently and the review takes as
+    long as the slower one instead of both. Neither raises; errors come back as text.
+
+    Returns:
+        Tuple[str, str]: The feedback and the sentiment analysis.
+    """
+    feedback, sentiment = await asyncio.gather(
+        get_feedback_from_model(history, scenario_details),
+        analyze_post_sentiment(post_title, post_content, scenario_details),
+    )
+    return feedback, sentiment
+
+
 # --- This part is for direct testing of the service. It won't be run by FastAPI ---
 if __name__ == "__main__":
     load_dotenv() # Ensure .env is loaded for testing
@@ -317,54 +1162,50 @@ if __name__ == "__main__":
 
     # Test GeminiChatSession
     print("\n--- Testing GeminiChatSession directly ---")
-    session_id_test = "test_session_123"
     test_backstory = "You are a new customer who needs help setting up your internet router."
-    test_tone = "slightly confused but cooperative"
+    test_tones = [
+        "slightly confused but cooperative",
+        "impatient and frustrated",
+        "friendly and chatty",
+    ]
     test_goals = [
         "How do I connect the cables?",
         "What is the default Wi-Fi password?",
         "How do I change the Wi-Fi password?",
         "Is there a mobile app for management?"
     ]
+    test_script = [
+        "Hello, how can I help you?",
+        "To connect the cables, please plug the power adapter into the router and wall outlet, and connect the Ethernet cable from your modem to the router's WAN port.",
+        "The default Wi-Fi password is usually found on a sticker at the bottom of your router. Look for 'SSID' and 'Password'.",
+        "You can change the Wi-Fi password by logging into the router's web interface, typically by typing 192.168.1.1 into your browser, then navigating to wireless settings.",
+        "Yes, there is often a mobile app provided by the router manufacturer for easy management. Please check your router's documentation or the app store.",
+        "You're very welcome! Is there anything else?",
+    ]
 
-    test_session = GeminiChatSession(
-        session_id=session_id_test,
-        name="Test Customer", # Name is used in prompt construction
-        backstory=test_backstory,
-        tone=test_tone,
-        goal_questions=test_goals
-    )
+    # One session per tone, all following the same script
+    test_sessions = [
+        GeminiChatSession(
+            session_id=f"test_session_{i}",
+            chat_actor={
+                "customerName": "Test Customer", # Name is used in prompt construction
+                "backstory": test_backstory,
+                "tone": tone,
+                "goalQuestions": test_goals,
+            },
+            service_tier='flex', # Offline test run, latency doesn't matter
+        )
+        for i, tone in enumerate(test_tones)
+    ]
 
     async def run_test_chat():
-        initial_ai_response = await test_session.send_message("Hello, how can I help you?")
-        print(f"AI Customer: {initial_ai_response['ai_response']}")
-        print(f"Goals: {test_session.goals_answered}")
-
-        turn1_cs_response = "To connect the cables, please plug the power adapter into the router and wall outlet, and connect the Ethernet cable from your modem to the router's WAN port."
-        turn1_result = await test_session.send_message(turn1_cs_response)
-        print(f"AI Customer: {turn1_result['ai_response']}")
-        print(f"Goals: {test_session.goals_answered}")
-
-        turn2_cs_response = "The default Wi-Fi password is usually found on a sticker at the bottom of your router. Look for 'SSID' and 'Password'."
-        turn2_result = await test_session.send_message(turn2_cs_response)
-        print(f"AI Customer: {turn2_result['ai_response']}")
-        print(f"Goals: {test_session.goals_answered}")
-
-        turn3_cs_response = "You can change the Wi-Fi password by logging into the router's web interface, typically by typing 192.168.1.1 into your browser, then navigating to wireless settings."
-        turn3_result = await test_session.send_message(turn3_cs_response)
-        print(f"AI Customer: {turn3_result['ai_response']}")
-        print(f"Goals: {test_session.goals_answered}")
-
-        turn4_cs_response = "Yes, there is often a mobile app provided by the router manufacturer for easy management. Please check your router's documentation or the app store."
-        turn4_result = await test_session.send_message(turn4_cs_response)
-        print(f"AI Customer: {turn4_result['ai_response']}")
-        print(f"Goals: {test_session.goals_answered}")
-
-        turn5_cs_response = "You're very welcome! Is there anything else?"
-        turn5_result = await test_session.send_message(turn5_cs_response)
-        print(f"AI Customer: {turn5_result['ai_response']}")
-        print(f"Goals: {test_session.goals_answered}")
-
-
-    import asyncio
-    asyncio.run(run_test_chat())
\ No newline at end of file
+        # Turns within a session depend on the previous reply and stay in order,
+        # but the sessions are independent, so each round runs them concurrently.
+        for cs_message in test_script:
+            print(f"\nCustomer Service: {cs_message}")
+            results = await run_many(test_sessions, [cs_message] * len(test_sessions))
+            for session, result in zip(test_sessions, results):
+                print(f"AI Customer ({session.tone}): {result['ai_response']}")
+                print(f"Goals: {result['goals_answered']}")
+
+    asyncio.run(run_test_chat())
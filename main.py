@@ -1,23 +1,55 @@
-from fastapi import FastAPI, HTTPException # Make sure HTTPException is imported
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi import FastAPI, HTTPException, Request, Depends # Make sure HTTPException is imported
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import HTMLResponse, ORJSONResponse, StreamingResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
 import os
 import uuid
 import json
-from typing import Dict, List, Any 
+import orjson
+import mmap
+import hashlib
+import functools
+import tempfile
+import aiofiles
+import logging
+from typing import Dict, List, Any, Callable, Awaitable, Type, TypeVar
+from dataclasses import dataclass
 import asyncio # Import asyncio if not already present
+from contextlib import aclosing, asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
+from cachetools import TTLCache
+
+try:
+    import fcntl # POSIX only
+except ImportError:
+    fcntl = None
 
 import gemini_chat_service # The chat logic, including GeminiChatSession
 
+# Debug messages (one per request and turn) are off unless LOG_LEVEL=DEBUG. Arguments
+# are passed separately, so they are only formatted when the message is emitted.
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+log = logging.getLogger(__name__)
+
 # Define the path to your frontend directory (adjust "Frontend" if your folder is "frontend")
 FRONTEND_DIR = os.path.join(os.path.dirname(__file__), "Frontend")
 
 # The folder for images, logos, etc
 ASSETS_DIR = os.path.join(FRONTEND_DIR, "assets")
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the connection to Gemini before the first request arrives
+    await gemini_chat_service.warm_up()
+    watcher = asyncio.create_task(watch_scenarios())
+    yield
+    watcher.cancel()
+    for task in list(pending_openers.values()):
+        task.cancel()
+
+# orjson encodes every JSON response, instead of the stdlib json encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
 #configure CORS middleware
 app.add_middleware(
@@ -33,77 +65,241 @@ app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
 # Mount the assets directory for images and other assets
 app.mount("/assets", StaticFiles(directory=ASSETS_DIR), name="assets")
 
-# In-memory store for chat sessions
-chat_sessions: Dict[str, gemini_chat_service.GeminiChatSession] = {}
-
-# In-memory store for scenarios data
-scenarios_data: Dict[str, dict] = {}
-scenarios_file_path = os.path.join(FRONTEND_DIR, "scenarios.json")
+# In-memory store for chat sessions. Bounded so abandoned sessions (and their
+# histories) don't pile up: a session expires after SESSION_TTL_SECONDS without
+# a message, and the least recently used ones go first once MAX_CHAT_SESSIONS is reached.
+MAX_CHAT_SESSIONS = 10_000
+SESSION_TTL_SECONDS = 3600
+
+def cancel_opener(session_id: str):
+    task = pending_openers.get(session_id)
+    if task is not None:
+        task.cancel()
+
+class SessionCache(TTLCache):
+    # A session that is gone doesn't need its opener any more. Evictions to make room
+    # go through __delitem__, while expire() drops timed-out sessions directly.
+    def __delitem__(self, session_id):
+        try:
+            super().__delitem__(session_id)
+        finally:
+            cancel_opener(session_id)
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for session_id, _ in expired:
+            cancel_opener(session_id)
+        return expired
+
+chat_sessions: TTLCache = SessionCache(maxsize=MAX_CHAT_SESSIONS, ttl=SESSION_TTL_SECONDS)
+
+# Striped locks so concurrent /start_chat calls for the same session ID (e.g. client
+# retries) create the session once; a fixed pool avoids keeping a lock per session.
+SESSION_LOCK_STRIPES = 64
+session_locks = [asyncio.Lock() for _ in range(SESSION_LOCK_STRIPES)]
+
+def session_lock(session_id: str) -> asyncio.Lock:
+    return session_locks[hash(session_id) % SESSION_LOCK_STRIPES]
+
+# Opening messages still being generated, by session ID. /start_chat returns as soon as
+# the session exists and the opener is fetched from /start_chat/{session_id}/initial.
+# A task removes itself once done; the opener then lives on as the first history entry.
+pending_openers: Dict[str, asyncio.Task] = {}
+
+def forget_opener(session_id: str, task: asyncio.Task):
+    # Only if still registered: the session may have been evicted and restarted with
+    # the same ID since, and the new session's opener must stay
+    if pending_openers.get(session_id) is task:
+        del pending_openers[session_id]
+
+async def wait_for_opener(session_id: str):
+    task = pending_openers.get(session_id)
+    if task is not None:
+        # Shielded so a client disconnecting mid-wait doesn't cancel the opener itself
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # The opener was cancelled because its session was evicted, not this request
+            if not task.cancelled():
+                raise
+
+# Base for the request/response models: unknown fields are dropped and instances
+# are immutable once validated (they are only read after parsing)
+class FrozenModel(BaseModel):
+    model_config = ConfigDict(extra='ignore', frozen=True)
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+def json_body(model: Type[ModelT]) -> Callable[[Request], Awaitable[ModelT]]:
+    """
+    Dependency that validates the request body straight from its raw bytes with a
+    TypeAdapter built once, skipping FastAPI's decode-to-dict step. Invalid bodies get
+    the usual 422. Pair it with `openapi_extra=json_body_schema(model)` for the docs.
+    """
+    adapter = TypeAdapter(model)
 
-def reload_scenarios():
-    """Loads scenarios from the JSON file into memory."""
-    global scenarios_data
-    try:
-        with open(scenarios_file_path, 'r', encoding='utf-8') as f:
-            scenarios_list = json.load(f)
-            scenarios_data.clear()  # Clear existing data before reloading
-            for scenario in scenarios_list:
-                scenarios_data[scenario['id']] = scenario
-        print("Scenarios reloaded successfully.")
-    except FileNotFoundError:
-        print(f"ERROR: scenarios.json not found at {scenarios_file_path}")
-    except json.JSONDecodeError:
-        print(f"ERROR: Invalid JSON format in {scenarios_file_path}")
+    async def parse(request: Request) -> ModelT:
+        try:
+            return adapter.validate_json(await request.body())
+        except ValidationError as e:
+            raise RequestValidationError([{**err, "loc": ("body", *err["loc"])} for err in e.errors()])
+    return parse
 
-# Load scenarios on startup
-reload_scenarios()
+def json_body_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """The OpenAPI request body for routes that read it through `json_body`."""
+    return {"requestBody": {"required": True, "content": {"application/json": {"schema": model.model_json_schema()}}}}
 
 # Pydantic model for the new scenario data
-class ChatActor(BaseModel):
+class ChatActor(FrozenModel):
     customerName: str
     backstory: str
     tone: str
     goalQuestions: List[str]
 
-class NewScenario(BaseModel):
+class NewScenario(FrozenModel):
     id: str
     title: str
     initialFacts: str
     chatActor: ChatActor
 
 
+@dataclass(slots=True, frozen=True)
+class ScenarioView:
+    """What the endpoints need from a scenario, built once when the scenarios are loaded."""
+    title: str
+    chat_actor: Dict[str, Any] # as passed to GeminiChatSession
+    details: Dict[str, Any] # the whole scenario, as passed to feedback and sentiment analysis
+    system_prompt: str # the persona's system instruction, so sessions don't rebuild it
+
+    @classmethod
+    def from_scenario(cls, scenario: NewScenario) -> "ScenarioView":
+        details = scenario.model_dump()
+        return cls(
+            title=scenario.title,
+            chat_actor=details["chatActor"],
+            details=details,
+            system_prompt=gemini_chat_service.build_system_prompt(details["chatActor"]),
+        )
+
+# In-memory store for scenarios data, validated and converted once when loaded so
+# requests don't check for missing keys or convert the scenario on every call
+scenarios_data: Dict[str, ScenarioView] = {}
+scenarios_file_path = os.path.join(FRONTEND_DIR, "scenarios.json")
+# Modification time (ns) of scenarios.json when it was last loaded
+scenarios_mtime_ns = 0
+# How often the file is checked for changes made outside the app
+SCENARIOS_POLL_SECONDS = 30
+
+def reload_scenarios():
+    """Loads scenarios from the JSON file into memory, unless the file is unchanged since the last load."""
+    global scenarios_data, scenarios_mtime_ns
+    try:
+        mtime_ns = os.stat(scenarios_file_path).st_mtime_ns
+        if mtime_ns == scenarios_mtime_ns:
+            return
+        with open(scenarios_file_path, 'rb') as f:
+            # orjson parses straight from the mapped file, without reading it into a copy first
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                scenarios_list = orjson.loads(view)
+        # Validate everything, then swap the whole dict in one assignment so
+        # requests never see a half-loaded store
+        scenarios_data = {
+            scenario['id']: ScenarioView.from_scenario(NewScenario(**scenario)) for scenario in scenarios_list
+        }
+        scenarios_mtime_ns = mtime_ns
+        log.info("Scenarios reloaded successfully.")
+    except FileNotFoundError:
+        log.error("scenarios.json not found at %s", scenarios_file_path)
+    except json.JSONDecodeError: # orjson's decode error subclasses this
+        log.error("Invalid JSON format in %s", scenarios_file_path)
+    except (KeyError, ValidationError) as e:
+        log.error("Invalid scenario data in %s: %s", scenarios_file_path, e)
+    except ValueError: # mmap refuses empty files
+        log.error("%s is empty", scenarios_file_path)
+
+async def watch_scenarios():
+    """Reloads the scenarios whenever scenarios.json changes on disk."""
+    while True:
+        await asyncio.sleep(SCENARIOS_POLL_SECONDS)
+        try:
+            changed = os.stat(scenarios_file_path).st_mtime_ns != scenarios_mtime_ns
+        except FileNotFoundError:
+            continue
+        if changed:
+            # Parsing and validation run in a thread to keep the event loop free
+            await asyncio.to_thread(reload_scenarios)
+
+# Load scenarios on startup
+reload_scenarios()
+
+# Serializes read-modify-write updates of scenarios.json within this process
+scenarios_write_lock = asyncio.Lock()
+# ...and across the server's worker processes, with a file lock held around each update
+scenarios_lock_path = scenarios_file_path + '.lock'
+
+def append_scenario(new_scenario: Dict[str, Any]):
+    with open(scenarios_lock_path, 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        with open(scenarios_file_path, 'rb') as f:
+            scenarios_list = orjson.loads(f.read())
+        scenarios_list.append(new_scenario)
+
+        # Save the updated list to a temporary file and swap it in, so readers
+        # (and a crash midway) never see a half-written scenarios.json. The name is
+        # unique so concurrent writers never share a temporary file.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(scenarios_file_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(orjson.dumps(scenarios_list, option=orjson.OPT_INDENT_2))
+            os.chmod(tmp_path, os.stat(scenarios_file_path).st_mode & 0o777)
+            os.replace(tmp_path, scenarios_file_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
 # Endpoint to add a new scenario
 @app.post("/add_scenario")
 async def add_scenario(scenario: NewScenario):
-    print("DEBUG_BACKEND: Received request to add a new scenario.")
+    log.debug("Received request to add a new scenario.")
     try:
-        # Load existing scenarios
-        with open(scenarios_file_path, 'r', encoding='utf-8') as f:
-            scenarios_list = json.load(f)
-
-        # Append the new scenario
-        scenarios_list.append(scenario.dict())
-
-        # Save the updated list back to the file
-        with open(scenarios_file_path, 'w', encoding='utf-8') as f:
-            json.dump(scenarios_list, f, indent=4)
+        async with scenarios_write_lock:
+            # Run in a worker thread, as waiting for another worker's file lock blocks
+            await asyncio.to_thread(append_scenario, scenario.model_dump())
 
         # Reload scenarios into memory to make the new one available
-        reload_scenarios()
+        await asyncio.to_thread(reload_scenarios)
 
         return {"message": f"Scenario '{scenario.title}' added successfully!"}
 
     except Exception as e:
-        print(f"ERROR_BACKEND: Failed to add new scenario: {e}")
+        log.error("Failed to add new scenario: %s", e)
         raise HTTPException(status_code=500, detail="Failed to add new scenario.")
 
 # Endpoint to export scenarios.json content. Open https://app-name/export_scenarios to download the file. 
+# The exported bytes and their ETag, keyed by the file's mtime so an edit is picked up
+# on the next request; the TTL only bounds how long old versions are kept.
+export_cache: TTLCache = TTLCache(maxsize=4, ttl=60)
+
 @app.get("/export_scenarios")
-async def export_scenarios():
+async def export_scenarios(request: Request):
     """Returns the contents of scenarios.json for local use."""
     try:
-        with open(scenarios_file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        mtime_ns = os.stat(scenarios_file_path).st_mtime_ns
+        entry = export_cache.get(mtime_ns)
+        if entry is None:
+            async with aiofiles.open(scenarios_file_path, 'rb') as f:
+                content = await f.read()
+            # Parsed only to reject a broken file; the bytes are sent as they are,
+            # skipping FastAPI's encode of the parsed list
+            orjson.loads(content)
+            etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+            entry = export_cache[mtime_ns] = (content, etag)
+
+        content, etag = entry
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag})
+        return Response(content=content, media_type="application/json", headers={"ETag": etag})
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="scenarios.json not found on server.")
     except json.JSONDecodeError:
@@ -111,122 +307,159 @@ async def export_scenarios():
 
 
 # Pydantic model for the chat request body
-class ChatRequest(BaseModel):
+class ChatRequest(FrozenModel):
     message: str
     session_id: str # Include session_id in the request
     scenario_id: str # Include scenario_id in the request
 
 # Pydantic model for the chat response body
-class ChatResponse(BaseModel):
+class ChatResponse(FrozenModel):
     response: str
 
-class FeedbackRequest(BaseModel):
+class FeedbackRequest(FrozenModel):
     history: list
     scenario_id: str
 
-class FeedbackResponse(BaseModel):
-    feedback: str
+# The main page is static, so it is read once at startup and served from memory
+# with an ETag; browsers revalidating an unchanged page get an empty 304.
+index_html_path = os.path.join(FRONTEND_DIR, "index.html")
+try:
+    with open(index_html_path, 'rb') as f:
+        INDEX_HTML = f.read()
+    INDEX_ETAG = f'"{hashlib.blake2b(INDEX_HTML, digest_size=16).hexdigest()}"'
+except FileNotFoundError:
+    INDEX_HTML = None
+    INDEX_ETAG = None
+INDEX_HEADERS = {"ETag": INDEX_ETAG, "Cache-Control": "public, max-age=60"} if INDEX_ETAG else {}
 
 @app.get("/", response_class=HTMLResponse)
-async def read_root():
+async def read_root(request: Request):
     """Serves the main HTML page."""
-    index_html_path = os.path.join(FRONTEND_DIR, "index.html")
-    if os.path.exists(index_html_path):
-        return FileResponse(index_html_path)
-    raise HTTPException(status_code=404, detail="index.html not found.")
+    if INDEX_HTML is None:
+        raise HTTPException(status_code=404, detail="index.html not found.")
+    if request.headers.get("if-none-match") == INDEX_ETAG:
+        return Response(status_code=304, headers=INDEX_HEADERS)
+    return HTMLResponse(content=INDEX_HTML, headers=INDEX_HEADERS)
 
 # Chat endpoint for ongoing conversations
-@app.post("/chat")
-async def chat(request: ChatRequest):
-    print(f"DEBUG_BACKEND: Received chat request for session ID: {request.session_id}")
-
-    # Check if the session exists
-    if request.session_id not in chat_sessions:
-        # If no session, it means the user skipped the /start_chat endpoint
+@app.post("/chat", openapi_extra=json_body_schema(ChatRequest))
+async def chat(request: ChatRequest = Depends(json_body(ChatRequest))):
+    log.debug("Received chat request for session ID: %s", request.session_id)
+
+    # Check if the session exists (a single lookup, so it can't expire in between)
+    session = chat_sessions.get(request.session_id)
+    if session is None:
+        # If no session, the user skipped the /start_chat endpoint or the session expired
         raise HTTPException(status_code=400, detail="Chat session not found. Please start a new chat.")
 
-    try:
-        session = chat_sessions[request.session_id]
-        
-        # Send the user's message to the existing chat session
-        response_data = await session.send_message(customer_service_response=request.message)
-        
-        customer_response_text = response_data["ai_response"]
-        goals_answered = response_data["goals_answered"]
-        
-        print(f"DEBUG_BACKEND: Received Gemini API response (first 200 chars): {customer_response_text[:200]}...")
-        print(f"DEBUG_BACKEND: Goals answered status: {goals_answered}")
-
-        return {"response": customer_response_text}
-
-    except Exception as e:
-        print(f"ERROR_BACKEND: Failed to get AI response: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to get AI response: {e}")
+    # Re-inserting restarts the session's expiry
+    chat_sessions[request.session_id] = session
+    # The first customer service message has to follow the AI's opener
+    await wait_for_opener(request.session_id)
+
+    async def event_stream():
+        # Server-sent events: each chunk of the AI's reply is sent as soon as Gemini
+        # generates it. Chunks are JSON-encoded so newlines in them can't end the event.
+        # The session takes turns: a second request for it waits here until the reply
+        # being streamed is complete. Closed explicitly so a disconnected client frees it at once.
+        chunks = []
+        async with aclosing(session.send_message_stream(customer_service_response=request.message)) as stream:
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield f"data: {orjson.dumps(chunk).decode()}\n\n"
+        yield "event: done\ndata: {}\n\n"
+
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Received Gemini API response (first 200 chars): %s...", "".join(chunks)[:200])
+            log.debug("Goals answered status: %s", session.goals_answered)
+
+    # Gemini errors are turned into a fallback reply inside the stream, so once the
+    # session is found the response is always a 200 stream
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 # Pydantic model for the start chat request
-class StartChatRequest(BaseModel):
+class StartChatRequest(FrozenModel):
     session_id: str
     scenario_id: str
 
-@app.post("/start_chat")
-async def start_chat(request: StartChatRequest):
-    print(f"DEBUG_BACKEND: Received start_chat request for session ID: {request.session_id}")
+@app.post("/start_chat", openapi_extra=json_body_schema(StartChatRequest))
+async def start_chat(request: StartChatRequest = Depends(json_body(StartChatRequest))):
+    log.debug("Received start_chat request for session ID: %s", request.session_id)
     try:
-        if request.scenario_id not in scenarios_data:
+        scenario_details = scenarios_data.get(request.scenario_id)
+        if scenario_details is None:
             raise HTTPException(status_code=404, detail="Scenario not found.")
-        
-        scenario_details = scenarios_data[request.scenario_id]
 
-        if "chatActor" not in scenario_details:
-            raise HTTPException(status_code=400, detail="Invalid scenario data. 'chatActor' key is missing.")
+        async with session_lock(request.session_id):
+            # A duplicate request for a session that has already started gets the same session
+            if request.session_id in chat_sessions:
+                return {"session_id": request.session_id}
 
-        # Create a new chat session
-        session = gemini_chat_service.GeminiChatSession(
-            session_id=request.session_id,
-            chat_actor=scenario_details["chatActor"]
-        )
-        chat_sessions[request.session_id] = session
+            # Create a new chat session
+            session = gemini_chat_service.GeminiChatSession(
+                session_id=request.session_id,
+                chat_actor=scenario_details.chat_actor,
+                scenario_id=request.scenario_id,
+                prebuilt_system_prompt=scenario_details.system_prompt,
+            )
+            chat_sessions[request.session_id] = session
+
+            # Generate the AI's opening message in the background so the client can
+            # render the chat while Gemini answers
+            task = asyncio.create_task(session.start_new_chat_session())
+            pending_openers[request.session_id] = task
+            task.add_done_callback(functools.partial(forget_opener, request.session_id))
 
-        # Get the initial response from the AI
-        initial_response_data = await session.start_new_chat_session()
+        return {"session_id": request.session_id}
 
-        return {"response": initial_response_data["ai_response"]}
+    except Exception as e:
+        log.error("Failed to start chat session: %s", e)
+        raise HTTPException(status_code=500, detail=f"Failed to start chat session: {e}")
 
+# Returns the AI's opening message, waiting for it if it is still being generated
+@app.get("/start_chat/{session_id}/initial")
+async def start_chat_initial(session_id: str):
+    try:
+        await wait_for_opener(session_id)
     except Exception as e:
-        print(f"ERROR_BACKEND: Failed to start chat session: {e}")
+        log.error("Failed to start chat session: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to start chat session: {e}")
 
+    session = chat_sessions.get(session_id)
+    if session is None or not session.chat_history:
+        raise HTTPException(status_code=404, detail="Chat session not found. Please start a new chat.")
+    return {"response": session.chat_history[0]["text"]}
+
 # Feedback endpoint
-@app.post("/feedback", response_model=FeedbackResponse)
-async def feedback_endpoint(request: FeedbackRequest):
+@app.post("/feedback", openapi_extra=json_body_schema(FeedbackRequest))
+async def feedback_endpoint(request: FeedbackRequest = Depends(json_body(FeedbackRequest))):
     scenario_id = request.scenario_id
     conversation_history = request.history
 
     # Ensure the scenario is valid
-    if scenario_id not in scenarios_data:
+    selected_scenario = scenarios_data.get(scenario_id)
+    if selected_scenario is None:
         raise HTTPException(status_code=400, detail="Invalid scenario selected for feedback.")
 
-    selected_scenario = scenarios_data[scenario_id]
+    log.debug("Received feedback request for scenario ID: %s", scenario_id)
 
-    if 'chatActor' not in selected_scenario:
-        raise HTTPException(status_code=400, detail="Invalid scenario data. 'chatActor' key is missing.")
-
-    print(f"DEBUG_BACKEND: Received feedback request for scenario ID: {scenario_id}")
-
-    # The feedback logic will be handled by a new function in gemini_chat_service
-    try:
-        feedback_text = await gemini_chat_service.get_feedback_from_model(
+    async def event_stream():
+        # Streamed as server-sent events like /chat, so the feedback starts to show
+        # as soon as Gemini generates it. Closed explicitly so a disconnected client frees
+        # its concurrency slots at once.
+        async with aclosing(gemini_chat_service.get_feedback_stream(
             history=conversation_history,
-            scenario_details=selected_scenario
-        )
-        print("DEBUG_BACKEND: Successfully received feedback from model.")
-        return FeedbackResponse(feedback=feedback_text)
-    except Exception as e:
-        print(f"ERROR_BACKEND: Failed to get feedback from model: {e}")
-        raise HTTPException(status_code=500, detail="Failed to get feedback from the AI model.")
+            scenario_details=selected_scenario.details
+        )) as stream:
+            async for chunk in stream:
+                yield f"data: {orjson.dumps(chunk).decode()}\n\n"
+        yield "event: done\ndata: {}\n\n"
+        log.debug("Successfully streamed feedback from model.")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
     
 # New Pydantic model for the social media post analysis request
-class AnalyzePostRequest(BaseModel):
+class AnalyzePostRequest(FrozenModel):
     post_title: str
     post_content: str
     scenario_id: str
@@ -246,11 +479,11 @@ async def analyze_post(request_body: AnalyzePostRequest):
         analysis_result = await gemini_chat_service.analyze_post_sentiment(
             post_title=request_body.post_title,
             post_content=request_body.post_content,
-            scenario_details=scenario
+            scenario_details=scenario.details
         )
 
         return {"analysis": analysis_result}
 
     except Exception as e:
-        print(f"Error in sentiment analysis: {e}")
+        log.error("Error in sentiment analysis: %s", e)
         raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
@@ -1,9 +1,26 @@
-import google.generativeai as genai
+import argparse
+import asyncio
+import csv
+import functools
+import hashlib
 import os
+import re
+import sys
+import time
+import httpx
+import orjson
+from cachetools import LRUCache
+from tenacity import AsyncRetrying, retry_if_exception, stop_after_attempt, wait_exponential_jitter
 from dotenv import load_dotenv
 from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
 import torch
 
+try:
+    # libuv-based event loop; cheaper scheduling when many requests are in flight
+    import uvloop # optional
+except ImportError:
+    uvloop = None
+
 # Load environment variables from .env file
 load_dotenv()
 # Configure the Gemini API key
@@ -13,13 +30,176 @@ load_dotenv()
 
 google_api_key = os.environ.get("GOOGLE_API_KEY")
 
-try:
-    genai.configure(api_key=google_api_key)
-except KeyError:
+if not google_api_key:
     print("Error: GOOGLE_API_KEY environment variable not set.")
     print("Please set your Gemini API key as an environment variable or uncomment and update the script.")
     exit()
 
+# Gemini is called over its REST API directly: a text-in/text-out request needs none of the
+# SDK's protobuf marshalling, and the CLI starts without importing it
+MODEL_NAME = "gemini-1.5-flash" # Using gemini-1.5-flash for faster responses
+GEMINI_MODEL_URL = f"https://generativelanguage.googleapis.com/v1beta/models/{MODEL_NAME}"
+
+@functools.lru_cache(maxsize=None)
+def get_http_client():
+    """
+    Returns the HTTP client shared by every request. It keeps its connections alive and
+    speaks HTTP/2, so concurrent requests are multiplexed over one TLS connection.
+    Created on first use, inside the running event loop.
+    """
+    return httpx.AsyncClient(
+        headers={"x-goog-api-key": google_api_key, "Content-Type": "application/json"},
+        http2=True,
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        timeout=httpx.Timeout(60.0, connect=10.0),
+    )
+
+def build_request_body(prompt, system_instruction=None, generation_config=None):
+    """
+    Builds the generateContent request body, serialized with orjson.
+    """
+    body = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+    if system_instruction:
+        body["systemInstruction"] = {"parts": [{"text": system_instruction}]}
+    if generation_config:
+        body["generationConfig"] = generation_config
+    return orjson.dumps(body)
+
+def response_text(response):
+    """
+    Joins the text parts of the first candidate of a generateContent response.
+
+    Returns:
+        str: The text, or None if the response has none (e.g. it was blocked).
+    """
+    candidates = response.get("candidates")
+    if not candidates:
+        return None
+    parts = candidates[0].get("content", {}).get("parts", [])
+    return "".join(part.get("text", "") for part in parts) or None
+
+# Responses worth retrying: rate limited (429) and temporarily unavailable (503)
+RETRYABLE_STATUS_CODES = frozenset({429, 503})
+# Longest Retry-After the client honours before falling back to its own backoff
+MAX_RETRY_AFTER_SECONDS = 60
+
+def is_retryable(error):
+    """
+    Rate limits, unavailability and failed connection attempts are retried; anything else
+    is reported straight away. These all happen before any text is received, so a retried
+    streamed request never prints twice.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout))
+
+_backoff = wait_exponential_jitter(initial=0.5, max=8)
+
+def wait_before_retry(retry_state):
+    """
+    Waits as long as the server's Retry-After header asks, otherwise backs off
+    exponentially with jitter.
+    """
+    error = retry_state.outcome.exception()
+    if isinstance(error, httpx.HTTPStatusError):
+        retry_after = error.response.headers.get("retry-after", "")
+        if retry_after.isdigit() and int(retry_after) <= MAX_RETRY_AFTER_SECONDS:
+            return float(retry_after)
+    return _backoff(retry_state)
+
+async def generate_text(prompt, system_instruction=None, generation_config=None, echo=False):
+    """
+    Sends one generateContent request, retrying rate-limit and availability errors with
+    backoff. Other HTTP errors, and the last one once retries run out, propagate as httpx exceptions.
+
+    Args:
+        prompt (str): The prompt.
+        system_instruction (str, optional): Instructions shared by many prompts, sent as the system instruction.
+        generation_config (dict, optional): Generation parameters in the REST API's camelCase, e.g. the output token cap.
+        echo (bool): Print the text as it is generated, instead of only returning it once complete.
+
+    Returns:
+        str: The response text, or None if the response was empty.
+    """
+    client = get_http_client()
+    body = build_request_body(prompt, system_instruction, generation_config)
+
+    async for attempt in AsyncRetrying(
+        wait=wait_before_retry,
+        stop=stop_after_attempt(5),
+        retry=retry_if_exception(is_retryable),
+        reraise=True,
+    ):
+        with attempt:
+            if not echo:
+                response = await client.post(f"{GEMINI_MODEL_URL}:generateContent", content=body)
+                response.raise_for_status()
+                return response_text(orjson.loads(response.content))
+
+            # Streamed as server-sent events, so the first words show up as soon as they are generated
+            parts = []
+            async with client.stream("POST", f"{GEMINI_MODEL_URL}:streamGenerateContent", params={"alt": "sse"}, content=body) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    chunk_text = response_text(orjson.loads(line[5:]))
+                    if chunk_text:
+                        sys.stdout.write(chunk_text)
+                        sys.stdout.flush()
+                        parts.append(chunk_text)
+            if not parts:
+                return None
+            print()
+            return "".join(parts)
+
+async def warm_up():
+    """
+    Opens the connection to Gemini (TLS handshake, HTTP/2 setup) ahead of the first request,
+    by fetching the model's metadata, which costs no tokens. Failures are ignored; the
+    first real request reports them.
+    """
+    try:
+        await get_http_client().get(GEMINI_MODEL_URL)
+    except httpx.HTTPError:
+        pass
+
+# Generated texts by prompt hash, so rerunning the same scenario (or the statements for
+# the same scenario text) returns instantly without spending tokens
+generation_cache = LRUCache(maxsize=512)
+
+async def generate_cached(prompt, system_instruction=None, generation_config=None, echo=False):
+    """
+    Returns Gemini's response text for the prompt, from the cache if it was generated before.
+    API errors propagate and nothing is cached for them.
+
+    Args:
+        prompt (str): The prompt.
+        system_instruction (str, optional): Instructions shared by many prompts, sent as the system instruction.
+        generation_config (dict, optional): Generation parameters, see `generate_text`.
+        echo (bool): Print the text as it is generated, instead of only returning it once complete.
+
+    Returns:
+        str: The response text, or None if the response was empty.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update((system_instruction or "").encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(orjson.dumps(generation_config, option=orjson.OPT_SORT_KEYS))
+    key = digest.hexdigest()
+    text = generation_cache.get(key)
+    if text is not None:
+        if echo:
+            print(text)
+        return text
+
+    text = await generate_text(prompt, system_instruction, generation_config, echo=echo)
+    if text is not None:
+        generation_cache[key] = text
+    return text
+
 # --- Hugging Face Sentiment Analysis Setup ---
 # Load a pre-trained sentiment analysis model
 # distilbert-base-uncased-finetuned-sst-2-english is a good general binary (positive/negative) sentiment model.
@@ -33,28 +213,8 @@ except Exception as e:
     print("Please ensure you have an active internet connection and the 'transformers' and 'torch' libraries are installed.")
     exit()
 
-def generate_crisis_scenario(client_industry, crisis_type, severity):
-    """
-    Generates a detailed PR crisis scenario using the Gemini API.
-
-    Args:
-        client_industry (str): The client or industry involved (e.g., "tech startup", "food and beverage", "healthcare").
-        crisis_type (str): The type of crisis (e.g., "data breach", "product recall", "CEO misconduct").
-        severity (str): The severity of the crisis ("low", "medium", "high", "critical").
-
-    Returns:
-        str: A detailed description of the crisis event, or an error message.
-    """
-
-    model = genai.GenerativeModel('gemini-1.5-flash') # Using gemini-1.5-flash for faster responses
-
-    prompt = f"""
-    Generate a highly realistic and detailed PR crisis event based on the following parameters:
-
-    Client/Industry: {client_industry}
-    Crisis Type: {crisis_type}
-    Severity: {severity}
-
+# The sections every generated scenario is made of, shared by the single and batched prompts
+SCENARIO_SECTIONS = """\
     The output should include the following sections:
 
     1.  **Crisis Title:** A concise and impactful title for the crisis.
@@ -75,32 +235,243 @@ def generate_crisis_scenario(client_industry, crisis_type, severity):
         * Any immediate calls to action or demands from the public or stakeholders.
     5.  **Severity Impact Justification:** Briefly explain how the generated scenario aligns with the specified severity level (low, medium, high, critical) in terms of potential reputational damage, financial loss, legal consequences, and public trust.
 
-    Ensure the scenario is plausible and provides enough detail for a PR professional or student to begin formulating a response strategy.
+    Ensure the scenario is plausible and provides enough detail for a PR professional or student to begin formulating a response strategy."""
+
+# How many scenarios are requested in one batched call. Larger batches amortize the
+# instructions further, but latency and output quality drop past around ten rows.
+SCENARIO_BATCH_SIZE = 10
+
+# Output token caps: generation time grows with the output, and the statements are
+# meant to be short. Scenarios have five sections, so they get more room.
+SCENARIO_GENERATION_CONFIG = {"maxOutputTokens": 1200}
+HOLDING_STATEMENT_GENERATION_CONFIG = {"maxOutputTokens": 200}
+SOCIAL_MEDIA_GENERATION_CONFIG = {"maxOutputTokens": 80}
+
+# How many scenario requests `generate_many` keeps in flight at once. Keep it within
+# the Gemini requests-per-minute quota divided by the typical request duration.
+SCENARIO_MAX_CONCURRENCY = 16
+
+# The fixed part of the single-scenario request. It is sent as the system instruction,
+# so each request only carries the scenario parameters.
+SCENARIO_INSTRUCTIONS = f"""\
+    Generate a highly realistic and detailed PR crisis event based on the parameters given in the request.
+
+{SCENARIO_SECTIONS}
+"""
+
+SCENARIO_PROMPT_TEMPLATE = (
+    "Client/Industry: {client_industry}\n"
+    "Crisis Type: {crisis_type}\n"
+    "Severity: {severity}\n"
+)
+
+# Asks for several scenarios in one request; the row list and count are filled in per batch
+SCENARIO_BATCH_TEMPLATE = """
+    Generate a highly realistic and detailed PR crisis event for each of the rows below.
+    Each row gives the client/industry, the crisis type and its severity.
+
+""" + SCENARIO_SECTIONS + """
+
+    Rows:
+{listed_rows}
+
+    Return a JSON array of {row_count} objects, one per row and in the same order, with the keys
+    title, initial_facts, actors, media, severity_justification holding sections 1 to 5 as text.
+    """
+
+SCENARIO_BATCH_ROW_TEMPLATE = "{index}) industry={client_industry}, crisis={crisis_type}, severity={severity}"
+
+# Structured output for batched scenarios: the model has to return exactly these fields
+SCENARIO_FIELDS = ("title", "initial_facts", "actors", "media", "severity_justification")
+SCENARIO_BATCH_GENERATION_CONFIG = {
+    "responseMimeType": "application/json",
+    "responseSchema": {
+        "type": "ARRAY",
+        "items": {
+            "type": "OBJECT",
+            "properties": {field: {"type": "STRING"} for field in SCENARIO_FIELDS},
+            "required": list(SCENARIO_FIELDS),
+            "propertyOrdering": list(SCENARIO_FIELDS),
+        },
+    },
+}
+
+# Section headings of a generated scenario (see SCENARIO_SECTIONS), however the model marks them up
+SCENARIO_HEADINGS = ("Crisis Title", "Initial Facts", "Key Actors Involved", "Immediate Media Implications", "Severity Impact Justification")
+SCENARIO_HEADING_PATTERN = re.compile(
+    r"^[#\d. \t]*(?:\*\*)?(" + "|".join(map(re.escape, SCENARIO_HEADINGS)) + r")(?:\*\*)?(?::(?:\*\*)?|(?=[ \t]*$))[ \t]*",
+    re.IGNORECASE | re.MULTILINE,
+)
+# What the holding statement is written from. The media section (headlines, hashtags) is
+# the longest and isn't needed for it.
+HOLDING_STATEMENT_SECTIONS = ("Crisis Title", "Initial Facts", "Key Actors Involved", "Severity Impact Justification")
+
+def scenario_sections(crisis_scenario_text, headings):
+    """
+    Extracts the given sections from a generated scenario, to send a follow-up request
+    only what it needs.
+
+    Returns:
+        str: The sections, or the whole scenario if one of them can't be found.
+    """
+    matches = list(SCENARIO_HEADING_PATTERN.finditer(crisis_scenario_text))
+    sections = {}
+    for match, next_match in zip(matches, matches[1:] + [None]):
+        end = next_match.start() if next_match else len(crisis_scenario_text)
+        sections[match.group(1).lower()] = crisis_scenario_text[match.end():end].strip()
+    if not all(sections.get(heading.lower()) for heading in headings):
+        return crisis_scenario_text
+    return "\n\n".join(f"{heading}: {sections[heading.lower()]}" for heading in headings)
+
+def build_scenario_prompt(client_industry, crisis_type, severity):
+    """
+    Builds the prompt asking Gemini for one crisis scenario with the given parameters.
+    It goes with SCENARIO_INSTRUCTIONS as the system instruction.
     """
+    return SCENARIO_PROMPT_TEMPLATE.format_map(
+        {"client_industry": client_industry, "crisis_type": crisis_type, "severity": severity}
+    )
+
+class ScenarioGenerationError(Exception):
+    """Raised when a crisis scenario could not be generated; the message says why."""
+
+async def generate_crisis_scenario(client_industry, crisis_type, severity, echo=False):
+    """
+    Generates a detailed PR crisis scenario using the Gemini API.
+
+    Args:
+        client_industry (str): The client or industry involved (e.g., "tech startup", "food and beverage", "healthcare").
+        crisis_type (str): The type of crisis (e.g., "data breach", "product recall", "CEO misconduct").
+        severity (str): The severity of the crisis ("low", "medium", "high", "critical").
+        echo (bool): Print the scenario (or error message) as it is generated.
+
+    Returns:
+        str: A detailed description of the crisis event.
+
+    Raises:
+        ScenarioGenerationError: If no scenario could be generated.
+    """
+
+    prompt = build_scenario_prompt(client_industry, crisis_type, severity)
 
     try:
-        response = model.generate_content(prompt)
-        # Access the text from the GenerateContentResponse object
-        if response.parts:
-            return response.text
+        text = await generate_cached(prompt, system_instruction=SCENARIO_INSTRUCTIONS,
+                                     generation_config=SCENARIO_GENERATION_CONFIG, echo=echo)
+        if text is not None:
+            return text
         else:
-            return "Could not generate content. The response was empty."
+            message = "Could not generate content. The response was empty."
     except Exception as e:
-        return f"An error occurred while generating the crisis scenario: {e}"
-    
-def generate_holding_statement(crisis_scenario_text):
+        message = f"An error occurred while generating the crisis scenario: {e}"
+    if echo:
+        print(message)
+    raise ScenarioGenerationError(message)
+
+async def generate_many(params_list, max_concurrency=SCENARIO_MAX_CONCURRENCY):
     """
-    Generates a professional holding statement based on the crisis scenario.
+    Generates one crisis scenario per parameter tuple, with up to `max_concurrency`
+    requests in flight at once instead of one after the other.
 
     Args:
-        crisis_scenario_text (str): The detailed crisis event description from generate_crisis_scenario.
+        params_list (list[tuple[str, str, str]]): (client_industry, crisis_type, severity) for each scenario.
+        max_concurrency (int): The maximum number of concurrent API requests.
 
     Returns:
-        str: A draft holding statement.
+        list[str]: The scenarios (or error messages), in the order of `params_list`.
     """
-    model = genai.GenerativeModel('gemini-1.5-flash')
+    semaphore = asyncio.Semaphore(max_concurrency)
 
-    prompt = f"""
+    async def generate_one(params):
+        async with semaphore:
+            try:
+                return await generate_crisis_scenario(*params)
+            except ScenarioGenerationError as e:
+                return str(e)
+
+    return await asyncio.gather(*(generate_one(params) for params in params_list))
+
+async def generate_crisis_scenarios_batch(rows, batch_size=SCENARIO_BATCH_SIZE):
+    """
+    Generates several crisis scenarios, asking for up to `batch_size` of them per API request
+    so the instructions are sent once per batch instead of once per scenario.
+
+    Args:
+        rows (list[tuple[str, str, str]]): (client_industry, crisis_type, severity) for each scenario.
+        batch_size (int): The maximum number of scenarios requested in one call.
+
+    Returns:
+        list: One dict per row with the keys title, initial_facts, actors, media and
+        severity_justification, or an error message (str) for rows whose batch failed.
+    """
+    results = []
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        listed_rows = "\n".join(
+            SCENARIO_BATCH_ROW_TEMPLATE.format_map(
+                {"index": i, "client_industry": client_industry, "crisis_type": crisis_type, "severity": severity}
+            )
+            for i, (client_industry, crisis_type, severity) in enumerate(batch, 1)
+        )
+        prompt = SCENARIO_BATCH_TEMPLATE.format_map({"listed_rows": listed_rows, "row_count": len(batch)})
+
+        try:
+            text = await generate_cached(prompt, generation_config=SCENARIO_BATCH_GENERATION_CONFIG)
+            scenarios = orjson.loads(text or "null")
+            if not isinstance(scenarios, list) or len(scenarios) != len(batch):
+                raise ValueError(f"expected {len(batch)} scenarios, got {len(scenarios) if isinstance(scenarios, list) else 'no list'}")
+            results.extend(scenarios)
+        except Exception as e:
+            results.extend([f"An error occurred while generating the crisis scenario: {e}"] * len(batch))
+
+    return results
+
+BATCH_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+def generate_crisis_scenarios_batch_mode(rows, poll_every=30):
+    """
+    Generates one crisis scenario per row through the Gemini Batch API, which is billed at
+    half the interactive price. Meant for offline runs (exercise sets, corpus building)
+    where results may take minutes to hours.
+
+    Args:
+        rows (list[tuple[str, str, str]]): (client_industry, crisis_type, severity) for each scenario.
+        poll_every (int): How often to poll the batch job for completion, in seconds.
+
+    Returns:
+        list[str]: The scenarios (or error messages), in the order of `rows`.
+    """
+    # The batch endpoints are only available in the newer google-genai client
+    from google import genai as genai_client
+
+    client = genai_client.Client(api_key=google_api_key)
+    requests = [
+        {
+            "contents": [{"parts": [{"text": build_scenario_prompt(*row)}], "role": "user"}],
+            "config": {"system_instruction": SCENARIO_INSTRUCTIONS, **SCENARIO_GENERATION_CONFIG},
+        }
+        for row in rows
+    ]
+    job = client.batches.create(model=MODEL_NAME, src=requests, config={"display_name": "prsim-scenarios"})
+    while job.state.name not in BATCH_DONE_STATES:
+        time.sleep(poll_every)
+        job = client.batches.get(name=job.name)
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        return [f"An error occurred while generating the crisis scenario: batch job {job.name} ended in state {job.state.name}"] * len(rows)
+
+    # Inline responses come back in request order
+    results = []
+    for inlined in job.dest.inlined_responses:
+        if inlined.error is not None:
+            results.append(f"An error occurred while generating the crisis scenario: {inlined.error}")
+        else:
+            # The google-genai client returns None rather than raising when there is no text
+            text = inlined.response.text if inlined.response is not None else None
+            results.append(text or "Could not generate content. The response was empty.")
+    return results
+
+# Prompt templates for the statements, filled in with str.format_map
+HOLDING_STATEMENT_TEMPLATE = """
     Given the following PR crisis scenario, draft a concise and professional **Holding Statement**.
 
     A holding statement is an initial, brief public communication designed to:
@@ -118,31 +489,24 @@ def generate_holding_statement(crisis_scenario_text):
     **Draft Holding Statement:**
     """
 
-    try:
-        response = model.generate_content(prompt)
-        if response.parts:
-            return response.text
-        else:
-            return "Could not generate holding statement. The response was empty."
-    except Exception as e:
-        return f"An error occurred while generating the holding statement: {e}"
-
-def generate_social_media_draft(crisis_scenario_text, holding_statement_text):
-    """
-    Generates an initial social media post draft based on the crisis scenario and holding statement.
-    This post should aim to "buy time" and direct users to official channels.
+# Severities whose holding statement is filled in locally rather than generated
+LOCAL_HOLDING_STATEMENT_SEVERITIES = frozenset({"low", "medium"})
 
-    Args:
-        crisis_scenario_text (str): The detailed crisis event description.
-        holding_statement_text (str): The generated holding statement.
+LOCAL_HOLDING_STATEMENT_TEMPLATE = (
+    "We are aware of the {crisis_type} reported today and are taking it seriously. "
+    "Our team is actively investigating the situation and working to address it. "
+    "We will share more information as soon as it is available. "
+    "We appreciate everyone's patience and understanding."
+)
 
-    Returns:
-        str: A draft social media post (e.g., for Twitter/X, Facebook).
-    """
-    model = genai.GenerativeModel('gemini-1.5-flash')
+HOLDING_STATEMENT_CONTEXT_TEMPLATE = """
+    ---
+    Holding Statement (for context, do not copy verbatim):
+    {holding_statement_text}
+"""
 
-    prompt = f"""
-    Given the following PR crisis scenario and the drafted Holding Statement,
+SOCIAL_MEDIA_TEMPLATE = """
+    Given the following {source},
     create an initial social media post (suitable for platforms like Twitter/X or Facebook)
     that aims to "buy time" and direct users to official updates.
 
@@ -157,24 +521,90 @@ def generate_social_media_draft(crisis_scenario_text, holding_statement_text):
 
     Crisis Scenario:
     {crisis_scenario_text}
-
-    ---
-    Holding Statement (for context, do not copy verbatim):
-    {holding_statement_text}
-
+{holding_statement_context}
     ---
     **Draft Initial Social Media Post:**
     """
 
+async def generate_holding_statement(crisis_scenario_text, severity=None, crisis_type=None):
+    """
+    Generates a professional holding statement based on the crisis scenario.
+    For low and medium severity crises, when the crisis type is known, the statement is
+    filled in from a local template instead, as it would be near-boilerplate anyway.
+
+    Args:
+        crisis_scenario_text (str): The detailed crisis event description from generate_crisis_scenario.
+        severity (str, optional): The severity the scenario was generated with.
+        crisis_type (str, optional): The crisis type the scenario was generated with.
+
+    Returns:
+        str: A draft holding statement.
+    """
+    if severity in LOCAL_HOLDING_STATEMENT_SEVERITIES and crisis_type:
+        return LOCAL_HOLDING_STATEMENT_TEMPLATE.format_map({"crisis_type": crisis_type})
+
+    prompt = HOLDING_STATEMENT_TEMPLATE.format_map(
+        {"crisis_scenario_text": scenario_sections(crisis_scenario_text, HOLDING_STATEMENT_SECTIONS)}
+    )
+
+    try:
+        text = await generate_cached(prompt, generation_config=HOLDING_STATEMENT_GENERATION_CONFIG)
+        if text is not None:
+            return text
+        else:
+            return "Could not generate holding statement. The response was empty."
+    except Exception as e:
+        return f"An error occurred while generating the holding statement: {e}"
+
+async def generate_social_media_draft(crisis_scenario_text, holding_statement_text=None):
+    """
+    Generates an initial social media post draft based on the crisis scenario and, if given, the holding statement.
+    This post should aim to "buy time" and direct users to official channels.
+
+    Args:
+        crisis_scenario_text (str): The detailed crisis event description.
+        holding_statement_text (str, optional): The holding statement, given to the model as context.
+            Without it the draft only depends on the scenario, so it can be generated alongside the holding statement.
+
+    Returns:
+        str: A draft social media post (e.g., for Twitter/X, Facebook).
+    """
+    if holding_statement_text is None:
+        source = "PR crisis scenario"
+        holding_statement_context = ""
+    else:
+        source = "PR crisis scenario and the drafted Holding Statement"
+        holding_statement_context = HOLDING_STATEMENT_CONTEXT_TEMPLATE.format_map({"holding_statement_text": holding_statement_text})
+
+    prompt = SOCIAL_MEDIA_TEMPLATE.format_map({
+        "source": source,
+        "crisis_scenario_text": crisis_scenario_text,
+        "holding_statement_context": holding_statement_context,
+    })
+
     try:
-        response = model.generate_content(prompt)
-        if response.parts:
-            return response.text
+        text = await generate_cached(prompt, generation_config=SOCIAL_MEDIA_GENERATION_CONFIG)
+        if text is not None:
+            return text
         else:
             return "Could not generate social media draft. The response was empty."
     except Exception as e:
         return f"An error occurred while generating the social media draft: {e}"
 
+async def generate_statements(crisis_scenario_text, severity=None, crisis_type=None):
+    """
+    Generates the holding statement and the social media draft for a scenario at the same time.
+    The draft is generated from the scenario alone, so neither request waits for the other.
+    `severity` and `crisis_type` are passed on to `generate_holding_statement`.
+
+    Returns:
+        tuple: (holding_statement, social_media_draft)
+    """
+    return await asyncio.gather(
+        generate_holding_statement(crisis_scenario_text, severity, crisis_type),
+        generate_social_media_draft(crisis_scenario_text),
+    )
+
 def get_user_edited_text(original_text, prompt_message):
     """
     Prompts the user to edit a given text, allowing multiple lines of input.
@@ -245,81 +675,154 @@ def analyze_sentiment(text):
     except Exception as e:
         return "Analysis Error", f"Could not perform sentiment analysis: {e}"
 
-def main():
+VALID_SEVERITIES = frozenset({"low", "medium", "high", "critical"})
+
+async def main():
     """
     Main function to run the PR crisis simulator console interface.
     """
     print("Welcome to the PR Crisis Simulator!")
     print("Let's generate a realistic crisis scenario for you.")
 
-    while True:
-        client_industry = input("\nEnter the client or industry (e.g., 'tech startup', 'airline', 'pharmaceutical company'): ").strip()
-        crisis_type = input("Enter the type of crisis (e.g., 'data breach', 'product recall', 'CEO misconduct', 'environmental damage'): ").strip()
-        severity = input("Enter the severity of the crisis ('low', 'medium', 'high', 'critical'): ").strip().lower()
-
-        if not all([client_industry, crisis_type, severity]):
-            print("All fields are required. Please try again.")
-            continue
+    # Connect while the user types the first scenario; the prompts below are read in
+    # worker threads so the event loop can run it
+    connection = asyncio.create_task(warm_up())
 
-        if severity not in ['low', 'medium', 'high', 'critical']:
-            print("Invalid severity. Please choose 'low', 'medium', 'high', or 'critical'.")
-            continue
-
-        print("\nGenerating crisis scenario, please wait...")
-        scenario = generate_crisis_scenario(client_industry, crisis_type, severity)
-        print("\n--- CRISIS SCENARIO GENERATED ---")
+    try:
+        while True:
+            client_industry = (await asyncio.to_thread(input, "\nEnter the client or industry (e.g., 'tech startup', 'airline', 'pharmaceutical company'): ")).strip()
+            crisis_type = (await asyncio.to_thread(input, "Enter the type of crisis (e.g., 'data breach', 'product recall', 'CEO misconduct', 'environmental damage'): ")).strip()
+            severity = (await asyncio.to_thread(input, "Enter the severity of the crisis ('low', 'medium', 'high', 'critical'): ")).strip().lower()
+
+            if not all([client_industry, crisis_type, severity]):
+                print("All fields are required. Please try again.")
+                continue
+
+            if severity not in VALID_SEVERITIES:
+                print("Invalid severity. Please choose 'low', 'medium', 'high', or 'critical'.")
+                continue
+
+            print("\nGenerating crisis scenario, please wait...")
+            print("\n--- CRISIS SCENARIO GENERATED ---")
+            try:
+                scenario = await generate_crisis_scenario(client_industry, crisis_type, severity, echo=True)
+            except ScenarioGenerationError:
+                # Already printed; there is nothing to write statements about
+                scenario = None
+            print("---------------------------------")
+
+            if scenario is not None:
+                # Start on the statements while the user reads the scenario and answers, so they are
+                # usually ready by the time they are asked for. The prompt is read in a worker thread
+                # to keep the event loop free for the requests.
+                statements = asyncio.create_task(generate_statements(scenario, severity, crisis_type))
+                generate_statements_choice = (await asyncio.to_thread(input, "\nDo you want to generate a Holding Statement and Initial Social Media Draft for this scenario? (yes/no): ")).strip().lower()
+
+                if generate_statements_choice == 'yes':
+                    # --- Generate and Analyze Holding Statement ---
+                    if not statements.done():
+                        print("\nGenerating Holding Statement and Initial Social Media Draft, please wait...")
+                    initial_holding_statement, initial_social_media_post = await statements
+                    current_holding_statement = initial_holding_statement
+
+                    while True:
+                        print("\n--- HOLDING STATEMENT DRAFT ---")
+                        print(current_holding_statement)
+                        sentiment_summary, explanation = analyze_sentiment(current_holding_statement)
+                        print(f"\n--- SENTIMENT ANALYSIS (Holding Statement) ---")
+                        print(f"Summary: {sentiment_summary}")
+                        print(f"Explanation: {explanation}")
+                        print("---------------------------------")
+
+                        edit_choice = (await asyncio.to_thread(input, "\nDo you want to edit this Holding Statement? (yes/no): ")).strip().lower()
+                        if edit_choice == 'yes':
+                            current_holding_statement = await asyncio.to_thread(get_user_edited_text, current_holding_statement, "Edit your Holding Statement")
+                        else:
+                            break
+
+                    # --- Generate and Analyze Social Media Draft ---
+                    if current_holding_statement != initial_holding_statement:
+                        # The draft was generated alongside the original statement; base it on the edited one instead
+                        print("\nGenerating Initial Social Media Draft, please wait...")
+                        initial_social_media_post = await generate_social_media_draft(scenario, current_holding_statement)
+                    current_social_media_post = initial_social_media_post
+
+                    while True:
+                        print("\n--- INITIAL SOCIAL MEDIA DRAFT ---")
+                        print(current_social_media_post)
+                        sentiment_summary, explanation = analyze_sentiment(current_social_media_post)
+                        print(f"\n--- SENTIMENT ANALYSIS (Social Media Post) ---")
+                        print(f"Summary: {sentiment_summary}")
+                        print(f"Explanation: {explanation}")
+                        print("---------------------------------")
+
+                        edit_choice = (await asyncio.to_thread(input, "\nDo you want to edit this Social Media Post? (yes/no): ")).strip().lower()
+                        if edit_choice == 'yes':
+                            current_social_media_post = await asyncio.to_thread(get_user_edited_text, current_social_media_post, "Edit your Social Media Post")
+                        else:
+                            break
+                else:
+                    statements.cancel()
+                    print("Skipping statement generation.")
+
+            another = (await asyncio.to_thread(input, "\nDo you want to generate another scenario? (yes/no): ")).strip().lower()
+            if another != 'yes':
+                print("Thank you for using the PR Crisis Simulator. Goodbye!")
+                break
+    finally:
+        # Still running if the user quit before the warm-up finished
+        connection.cancel()
+        # Close the pooled connections while their event loop is still running
+        await get_http_client().aclose()
+        get_http_client.cache_clear()
+
+def run_batch(rows_path):
+    """
+    Generates a scenario for every row of a CSV file (client_industry,crisis_type,severity)
+    through the Batch API and prints them.
+    """
+    rows, errors = [], []
+    with open(rows_path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not row:
+                continue
+            cells = [cell.strip() for cell in row]
+            if len(cells) != 3 or not all(cells):
+                errors.append(f"line {reader.line_num}: expected client_industry,crisis_type,severity, got {row}")
+                continue
+            client_industry, crisis_type, severity = cells
+            severity = severity.lower()
+            if severity not in VALID_SEVERITIES:
+                errors.append(f"line {reader.line_num}: invalid severity {severity!r}, expected one of 'low', 'medium', 'high', 'critical'")
+                continue
+            rows.append((client_industry, crisis_type, severity))
+
+    # Checked before submitting, as the job is billed whether or not its rows make sense
+    if errors:
+        for error in errors:
+            print(f"{rows_path}, {error}")
+        raise SystemExit(f"{len(errors)} invalid row(s); no batch job was submitted.")
+
+    print(f"Submitting {len(rows)} scenarios as a batch job. This can take a while...")
+    scenarios = generate_crisis_scenarios_batch_mode(rows)
+    for (client_industry, crisis_type, severity), scenario in zip(rows, scenarios):
+        print(f"\n--- CRISIS SCENARIO: {client_industry} / {crisis_type} / {severity} ---")
         print(scenario)
         print("---------------------------------")
 
-        generate_statements_choice = input("\nDo you want to generate a Holding Statement and Initial Social Media Draft for this scenario? (yes/no): ").strip().lower()
-
-        if generate_statements_choice == 'yes':
-            # --- Generate and Analyze Holding Statement ---
-            print("\nGenerating Holding Statement, please wait...")
-            initial_holding_statement = generate_holding_statement(scenario)
-            current_holding_statement = initial_holding_statement
-
-            while True:
-                print("\n--- HOLDING STATEMENT DRAFT ---")
-                print(current_holding_statement)
-                sentiment_summary, explanation = analyze_sentiment(current_holding_statement)
-                print(f"\n--- SENTIMENT ANALYSIS (Holding Statement) ---")
-                print(f"Summary: {sentiment_summary}")
-                print(f"Explanation: {explanation}")
-                print("---------------------------------")
-
-                edit_choice = input("\nDo you want to edit this Holding Statement? (yes/no): ").strip().lower()
-                if edit_choice == 'yes':
-                    current_holding_statement = get_user_edited_text(current_holding_statement, "Edit your Holding Statement")
-                else:
-                    break
-
-            # --- Generate and Analyze Social Media Draft ---
-            print("\nGenerating Initial Social Media Draft, please wait...")
-            initial_social_media_post = generate_social_media_draft(scenario, current_holding_statement)
-            current_social_media_post = initial_social_media_post
-
-            while True:
-                print("\n--- INITIAL SOCIAL MEDIA DRAFT ---")
-                print(current_social_media_post)
-                sentiment_summary, explanation = analyze_sentiment(current_social_media_post)
-                print(f"\n--- SENTIMENT ANALYSIS (Social Media Post) ---")
-                print(f"Summary: {sentiment_summary}")
-                print(f"Explanation: {explanation}")
-                print("---------------------------------")
-
-                edit_choice = input("\nDo you want to edit this Social Media Post? (yes/no): ").strip().lower()
-                if edit_choice == 'yes':
-                    current_social_media_post = get_user_edited_text(current_social_media_post, "Edit your Social Media Post")
-                else:
-                    break
-        else:
-            print("Skipping statement generation.")
-
-        another = input("\nDo you want to generate another scenario? (yes/no): ").strip().lower()
-        if another != 'yes':
-            print("Thank you for using the PR Crisis Simulator. Goodbye!")
-            break
-
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="PR Crisis Simulator")
+    parser.add_argument("--batch", metavar="ROWS_CSV",
+                        help="generate a scenario for every client_industry,crisis_type,severity row of the file "
+                             "through the Gemini Batch API (half price, results in minutes to hours) instead of interactively")
+    args = parser.parse_args()
+
+    if args.batch:
+        run_batch(args.batch)
+    else:
+        # One event loop for the whole run: the shared HTTP client is bound to the loop it was first used on
+        if uvloop is not None:
+            uvloop.run(main())
+        else:
+            asyncio.run(main())
\ No newline at end of file